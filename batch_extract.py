@@ -0,0 +1,208 @@
+import os
+import argparse
+import pandas as pd
+from datetime import datetime
+from dotenv import load_dotenv
+
+from utilities.steam_api import resolve_vanity_urls
+from utilities.exporters import save_file
+from utilities.storage import save_to_sqlite
+from utilities.pipeline import extract_user_profiles, extract_user_games, extract_metadata, write_user_crawl
+from utilities.metrics import instrument_run
+from utilities.assets import collect_assets, collect_stored_assets, download_assets
+
+#---------------------- HEADLESS BATCH EXTRACTION ----------------------#
+#
+# Runs the whole extraction pipeline for many Steam IDs / vanity names in a
+# single process, sharing the HTTP pool, rate limiters and metadata lookups.
+#
+#   python batch_extract.py 76561199490364483 some_vanity_name
+#   python batch_extract.py --file users.txt --output csv --output-dir exports
+#   python batch_extract.py --file users.txt --output parquet --output-dir lake
+#   python batch_extract.py --file users.txt --procs 4     (crawl in 4 worker processes)
+#   python batch_extract.py --file users.txt --assets      (also store avatars, icons and headers)
+
+load_dotenv()
+
+API_KEY = os.getenv('API_KEY')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Extract Steam data for many users without any prompt.')
+    parser.add_argument('users', nargs='*', help='Steam IDs or vanity names')
+    parser.add_argument('--file', help='Text file with one Steam ID or vanity name per line')
+    parser.add_argument('--output', choices=['sqlite', 'csv', 'excel', 'json', 'parquet'], default='sqlite', help='Output target (default: raw sqlite database)')
+    parser.add_argument('--output-dir', default='.', help='Directory for file outputs')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MAX_WORKERS', 8)), help='Concurrent achievement requests per user')
+    parser.add_argument('--procs', type=int, default=1, help='Worker processes crawling users in parallel (default: 1, no pool)')
+    parser.add_argument('--incremental', action='store_true', help='Only refetch achievements of games changed since the last run')
+    parser.add_argument('--no-metadata', action='store_true', help='Skip store metadata enrichment')
+    parser.add_argument('--assets', action='store_true', help='Download avatars, game icons and store headers into the local asset store')
+    parser.add_argument('--cdc', action='store_true', help='Write only rows that changed since the stored version (sqlite output)')
+    parser.add_argument('--report', help='Path of the JSON run report (default: reports/batch_extract_<timestamp>.json)')
+    parser.add_argument('--profile', default=os.getenv('STEAM_PROFILE'), help='Dump cProfile stats of the run to this file')
+    return parser.parse_args()
+
+
+def read_users(args):
+    """
+    Collect user identifiers from the command line and the optional input file, dropping duplicates.
+    """
+
+    users = list(args.users)
+
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    users.append(line)
+
+    return list(dict.fromkeys(users))
+
+
+def resolve_users(users, max_workers=8):
+    """
+    Turn vanity names into Steam IDs, resolving them concurrently. 17-digit numbers are taken as Steam IDs already.
+    """
+
+    vanity_names = [user for user in users if not (user.isdigit() and len(user) == 17)]
+    resolved = resolve_vanity_urls(vanity_names, API_KEY, max_workers=max_workers) if vanity_names else {}
+
+    steam_ids = []
+
+    for user in users:
+        if user not in resolved:
+            steam_ids.append(user)
+        elif resolved[user] is None:
+            print(f'Vanity name not found, skipping: {user}')
+        else:
+            steam_ids.append(resolved[user])
+
+    return list(dict.fromkeys(steam_ids))
+
+
+def main():
+    args = parse_args()
+    instrument_run('batch_extract', report_path=args.report, profile_path=args.profile)
+    raw_method = 'cdc' if args.cdc else 'append'
+
+    steam_ids = resolve_users(read_users(args), max_workers=args.workers)
+
+    if not steam_ids:
+        print('No Steam IDs to process.')
+        return
+
+    print(f'Processing {len(steam_ids)} users...')
+
+    #---------- PROFILES, 100 PER REQUEST ----------#
+
+    df_profiles = extract_user_profiles(steam_ids, API_KEY)
+
+    if df_profiles is None:
+        print('No profile found for the given users.')
+        return
+
+    if args.output == 'sqlite':
+        save_to_sqlite(df_profiles, table_name='profile_data', method=raw_method)
+
+    found_ids = set(df_profiles['steamid'])
+    failed_users = [steam_user_id for steam_user_id in steam_ids if steam_user_id not in found_ids]
+    public_ids = set(df_profiles.loc[df_profiles['communityvisibilitystate'] == 3, 'steamid'])
+
+    #---------- GAMES AND ACHIEVEMENTS PER USER ----------#
+
+    game_frames = []
+    game_ids = set()
+
+    if args.procs > 1:
+        crawl_ids = [steam_user_id for steam_user_id in steam_ids if steam_user_id in public_ids]
+        print(f'\nCrawling {len(crawl_ids)} public profiles with {args.procs} worker processes...')
+
+        # Imported here so the single-process path does not pay for multiprocessing set-up
+        from utilities.sharding import crawl_users_sharded
+
+        crawls = crawl_users_sharded(crawl_ids, API_KEY, procs=args.procs, max_workers=args.workers, incremental=args.incremental)
+
+        for position, (steam_user_id, crawl) in enumerate(crawls, start=1):
+            if crawl is None:
+                continue
+
+            df_final = crawl['df_final']
+            print(f"[{position}/{len(crawl_ids)}] Steam ID {steam_user_id}: {len(df_final)} games, "
+                  f"{crawl['no_information_games']} without achievements, {crawl['failed_games']} failed")
+
+            # This process is the only writer, the workers never touch the raw database.
+            # Watermarks and player achievements are kept whatever the output, like in the single-process path
+            write_user_crawl(steam_user_id, crawl, method=raw_method, save_games=args.output == 'sqlite')
+
+            if args.output != 'sqlite':
+                game_frames.append(df_final)
+
+            game_ids.update(df_final['steam_game_id'].tolist())
+
+    else:
+        for position, steam_user_id in enumerate(steam_ids, start=1):
+            print(f'\n[{position}/{len(steam_ids)}] Steam ID {steam_user_id}')
+
+            if steam_user_id not in found_ids:
+                print(f'Profile {steam_user_id} not found, skipping.')
+                continue
+
+            if steam_user_id not in public_ids:
+                print(f'Profile {steam_user_id} is private, skipping games.')
+                continue
+
+            df_final = extract_user_games(steam_user_id, API_KEY, max_workers=args.workers, incremental=args.incremental, show_progress=False)
+
+            if df_final is None:
+                continue
+
+            if args.output == 'sqlite':
+                save_to_sqlite(df_final, table_name='collection_game_data', method=raw_method)
+            else:
+                game_frames.append(df_final)
+
+            game_ids.update(df_final['steam_game_id'].tolist())
+
+    #---------- METADATA SHARED BY EVERY USER ----------#
+
+    df_game_metadata = None if args.no_metadata else extract_metadata(sorted(game_ids))
+
+    #---------- OUTPUT ----------#
+
+    if args.output == 'sqlite':
+        if df_game_metadata is not None and not df_game_metadata.empty:
+            save_to_sqlite(df_game_metadata, table_name='game_metadata', method=raw_method)
+    else:
+        os.makedirs(args.output_dir, exist_ok=True)
+        # Parquet datasets are partitioned by snapshot date already: one dataset per table across runs
+        suffix = 'dataset' if args.output == 'parquet' else datetime.now().strftime('%Y%m%d')
+
+        outputs = {
+            f'steam_profile_data_{suffix}': df_profiles,
+            f'steam_collection_game_data_{suffix}': pd.concat(game_frames, ignore_index=True) if game_frames else None,
+            f'steam_game_metadata_{suffix}': df_game_metadata,
+        }
+
+        for file_name, df in outputs.items():
+            if df is not None and not df.empty:
+                print(f'Saved {save_file(df, file_name, args.output, args.output_dir)}')
+
+    #---------- IMAGES ----------#
+
+    if args.assets:
+        # The raw database holds every game written this run; file outputs only have the frames
+        if args.output == 'sqlite':
+            assets = collect_stored_assets()
+        else:
+            assets = collect_assets(df_profiles, pd.concat(game_frames, ignore_index=True) if game_frames else None, df_game_metadata)
+
+        counts = download_assets(assets, max_workers=args.workers, show_progress=False)
+        print(f"\nImages: {counts['downloaded']} downloaded, {counts['skipped']} already stored, {counts['failed']} failed.")
+
+    print(f'\nDone. {len(steam_ids) - len(failed_users)} users extracted, {len(failed_users)} failed.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+#---------------------- IMPORT-TIME BENCHMARK ----------------------#
+#
+# Measures the start-up cost of the entry points in fresh interpreters and
+# checks that the headless path does not load the interactive / optional
+# dependencies:
+#
+#   python benchmarks/bench_import.py --runs 10
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the interactive features need
+HEAVY_MODULES = ('openai', 'tkinter', 'questionary')
+
+TARGETS = {
+    'utilities.pipeline': True,
+    'utilities.storage': True,
+    'batch_extract': True,
+    'utilities.defs (facade)': True,
+    'utilities.ai': False,
+}
+
+PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'modules': len(sys.modules),
+    'heavy': [name for name in {heavy!r} if name in sys.modules],
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def measure(module, runs):
+    samples = []
+
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_DIR, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f'import {module} failed:\n{completed.stderr}')
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    return {
+        'seconds': statistics.median(sample['seconds'] for sample in samples),
+        'modules': samples[-1]['modules'],
+        'heavy': samples[-1]['heavy'],
+        'peak_rss_mb': statistics.median(sample['peak_rss_mb'] for sample in samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import time of the extractor entry points.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per target (the median is reported)')
+    args = parser.parse_args()
+
+    lean = True
+
+    print(f"{'target':<26} {'import':>9} {'modules':>8} {'peak RSS':>9}  heavy modules")
+
+    for target, headless in TARGETS.items():
+        module = target.split()[0]
+        result = measure(module, args.runs)
+
+        print(f"{target:<26} {result['seconds'] * 1000:7.0f}ms {result['modules']:8} {result['peak_rss_mb']:7.1f}MB  {', '.join(result['heavy']) or '-'}")
+
+        if headless and result['heavy']:
+            lean = False
+
+    if not lean:
+        print('\nA headless entry point loads interactive dependencies at import time.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
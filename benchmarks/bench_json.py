@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+
+#---------------------- JSON DECODING BENCHMARK ----------------------#
+#
+# Compares the former response.json() decoding with utilities/json_codec.py
+# (orjson when installed + field projection) on GetOwnedGames and appdetails
+# payloads: parse time, peak memory while decoding and memory kept afterwards.
+# Expect the memory columns to drop; the parse time of orjson + projection
+# stays close to response.json(), the projection spends what orjson saves.
+#
+#   python benchmarks/bench_json.py --games 20000 --appdetails 200
+#   python benchmarks/bench_json.py --record payloads/        (save the synthetic payloads)
+#   python benchmarks/bench_json.py --payloads payloads/      (replay recorded payloads)
+#
+# Recorded payloads are the raw answer bodies: owned_games_<name>.json and
+# appdetails_<appid>.json, e.g. saved with curl from the real endpoints.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from mock_steam import MockSteam
+from utilities import json_codec
+
+
+def synthetic_payloads(games, appdetails):
+    mock = MockSteam(games=games)
+    owned = {'owned_games_bench': json.dumps(mock.owned_games({'steamid': ['76561190000000001']})[1]).encode('utf-8')}
+    details = {
+        f'appdetails_{appid}': json.dumps(mock.appdetails({'appids': [str(appid)]})[1]).encode('utf-8')
+        for appid in range(1001, 1001 + appdetails)
+    }
+    return owned, details
+
+
+def recorded_payloads(path):
+    owned, details = {}, {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), 'rb') as f:
+            content = f.read()
+        if name.startswith('owned_games'):
+            owned[name[:-5]] = content
+        elif name.startswith('appdetails_'):
+            details[name[:-5]] = content
+    return owned, details
+
+
+def measure(decode, payloads, runs):
+    """
+    Median seconds per payload, peak traced memory while decoding one payload and memory still held by its result.
+    """
+
+    seconds, peaks, kept = [], [], []
+
+    for name, content in payloads.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = decode(name, content)
+            samples.append(time.perf_counter() - start)
+            # Freeing the result is not part of decoding
+            del result
+        seconds.append(statistics.median(samples))
+
+        tracemalloc.start()
+        result = decode(name, content)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        kept.append(current)
+        del result
+
+    return {
+        'ms_per_payload': statistics.mean(seconds) * 1000,
+        'peak_kb': statistics.mean(peaks) / 1024,
+        'kept_kb': statistics.mean(kept) / 1024,
+    }
+
+
+def response_json(name, content):
+    # What requests' response.json() does for a UTF-8 answer
+    return json.loads(content.decode('utf-8'))
+
+
+def owned_games(name, content):
+    return json_codec.decode_owned_games(content)
+
+
+def appdetails(name, content):
+    return json_codec.decode_appdetails(content, name.split('_')[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON decoding and projection of Steam payloads.')
+    parser.add_argument('--games', type=int, default=20000, help='Games in the synthetic GetOwnedGames answer')
+    parser.add_argument('--appdetails', type=int, default=200, help='Synthetic appdetails answers')
+    parser.add_argument('--runs', type=int, default=5, help='Decodes per payload (the median is reported)')
+    parser.add_argument('--payloads', help='Directory of recorded payloads to use instead of synthetic ones')
+    parser.add_argument('--record', help='Write the synthetic payloads to this directory and exit')
+    args = parser.parse_args()
+
+    if args.payloads:
+        owned, details = recorded_payloads(args.payloads)
+    else:
+        owned, details = synthetic_payloads(args.games, args.appdetails)
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        for name, content in {**owned, **details}.items():
+            with open(os.path.join(args.record, f'{name}.json'), 'wb') as f:
+                f.write(content)
+        print(f'{len(owned) + len(details)} payloads written to {args.record}')
+        return
+
+    backend = json_codec.orjson
+    print(f'fast parser: {json_codec.JSON_BACKEND}\n')
+    print(f"{'payload':<13} {'decoder':<22} {'ms/payload':>11} {'peak':>11} {'kept':>11}")
+
+    for label, payloads, decode in (('owned_games', owned, owned_games), ('appdetails', details, appdetails)):
+        if not payloads:
+            continue
+
+        size_kb = statistics.mean(len(content) for content in payloads.values()) / 1024
+        print(f'{label} ({len(payloads)} x {size_kb:,.0f} KB)')
+
+        results = [('response.json()', measure(response_json, payloads, args.runs))]
+
+        # Projection alone, then with the fast parser
+        json_codec.orjson = None
+        results.append(('json + projection', measure(decode, payloads, args.runs)))
+        json_codec.orjson = backend
+        if backend is not None:
+            results.append(('orjson + projection', measure(decode, payloads, args.runs)))
+
+        for decoder, result in results:
+            print(f"{'':<13} {decoder:<22} {result['ms_per_payload']:9.2f}ms {result['peak_kb']:9,.0f}KB {result['kept_kb']:9,.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+
+#---------------------- END-TO-END PIPELINE BENCHMARK ----------------------#
+#
+# Starts benchmarks/mock_steam.py, runs the headless extraction pipeline
+# (batch_extract.py) and etl_db_trusted.py against it on throwaway databases,
+# and reports throughput and peak memory of every step:
+#
+#   python benchmarks/bench_pipeline.py --users 5 --games 2000 --latency-ms 20
+#   python benchmarks/bench_pipeline.py --users 1 --games 50000 --rate-429 0.01 --json bench.json
+#   python benchmarks/bench_pipeline.py --users 40 --games 500 --procs 4
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a script as __main__ and reports its peak resident memory on stderr once everything else has exited
+PEAK_RSS_PROBE = """
+import sys, atexit, runpy, resource
+atexit.register(lambda: print('__PEAK_RSS_KB__', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr))
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args, port):
+    command = [
+        sys.executable, os.path.join(REPO_DIR, 'benchmarks', 'mock_steam.py'),
+        '--port', str(port),
+        '--games', str(args.games),
+        '--achievements', str(args.achievements),
+        '--latency-ms', str(args.latency_ms),
+        '--jitter-ms', str(args.jitter_ms),
+        '--rate-429', str(args.rate_429),
+    ]
+    mock = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+    # Wait for the listening line before sending any request
+    line = mock.stdout.readline()
+    if 'listening' not in line:
+        mock.kill()
+        raise RuntimeError(f'Mock server did not start: {line}')
+
+    return mock
+
+
+def run_step(name, script_args, env, work_dir):
+    """
+    Run one script under the memory probe. Returns wall seconds and peak RSS in MB.
+    """
+
+    log_path = os.path.join(work_dir, f'{name}.log')
+
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        completed = subprocess.run(
+            [sys.executable, '-c', PEAK_RSS_PROBE] + script_args,
+            cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.PIPE, text=True
+        )
+    elapsed = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        print(completed.stderr)
+        raise RuntimeError(f'{name} failed, see {log_path}')
+
+    peak_kb = next(
+        (int(line.split()[1]) for line in completed.stderr.splitlines() if line.startswith('__PEAK_RSS_KB__')),
+        0
+    )
+
+    return elapsed, peak_kb / 1024
+
+
+def summarize(report):
+    requests = report.get('requests', {})
+    return {
+        'requests': sum(endpoint['count'] for endpoint in requests.values()),
+        'retries': sum(endpoint['retries'] for endpoint in requests.values()),
+        'throttled': sum(endpoint['throttled'] for endpoint in requests.values()),
+        'bytes': sum(endpoint['bytes'] for endpoint in requests.values()),
+        'rows_written': report.get('rows_written', {}),
+        'stages': {name: round(stage['seconds'], 3) for name, stage in report.get('stages', {}).items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extraction pipeline against a local Steam stand-in.')
+    parser.add_argument('--users', type=int, default=3, help='Number of synthetic users')
+    parser.add_argument('--games', type=int, default=1000, help='Games owned by every user (10 to 50000)')
+    parser.add_argument('--achievements', type=int, default=30, help='Maximum achievements per game')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='Latency of every mock answer')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='Random latency added on top')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Probability of a 429 answer')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent achievement requests')
+    parser.add_argument('--procs', type=int, default=1, help='Worker processes of batch_extract.py')
+    parser.add_argument('--api-rate', type=float, default=1000, help='Client-side Web API requests/s allowed to the mock')
+    parser.add_argument('--store-rate', type=float, default=1000, help='Client-side store requests/s allowed to the mock (Steam allows about 0.6)')
+    parser.add_argument('--no-metadata', action='store_true', help='Skip the store metadata step')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    mock = start_mock(args, port)
+
+    work_dir = tempfile.mkdtemp(prefix='steam_bench_')
+    env = dict(
+        os.environ,
+        API_KEY='bench',
+        STEAM_API_BASE=base_url,
+        STEAM_STORE_BASE=base_url,
+        STEAM_API_RATE=str(args.api_rate),
+        STEAM_STORE_RATE=str(args.store_rate),
+        STEAM_RAW_DB=os.path.join(work_dir, 'raw.db'),
+        STEAM_TRUSTED_DB=os.path.join(work_dir, 'trusted.db'),
+        STEAM_CACHE_DB=os.path.join(work_dir, 'cache.db'),
+        STEAM_METRICS_DIR=work_dir,
+    )
+
+    users = [f'bench_user_{i}' for i in range(args.users)]
+    extract_report = os.path.join(work_dir, 'batch_extract.json')
+
+    results = {'config': vars(args), 'work_dir': work_dir}
+
+    print(f'{args.users} users x {args.games:,} games, mock latency {args.latency_ms}ms, 429 rate {args.rate_429}, data in {work_dir}\n')
+
+    try:
+        extract_args = [os.path.join(REPO_DIR, 'batch_extract.py')] + users + ['--workers', str(args.workers), '--procs', str(args.procs), '--report', extract_report]
+        if args.no_metadata:
+            extract_args.append('--no-metadata')
+
+        elapsed, peak_mb = run_step('batch_extract', extract_args, env, work_dir)
+        with open(extract_report) as f:
+            extract = summarize(json.load(f))
+
+        games = extract['rows_written'].get('collection_game_data', 0)
+        results['batch_extract'] = dict(extract, seconds=round(elapsed, 3), peak_rss_mb=round(peak_mb, 1))
+
+        print(f"batch_extract    {elapsed:8.2f}s  {peak_mb:8.1f} MB peak  {games / elapsed:10,.0f} games/s  "
+              f"{extract['requests'] / elapsed:8,.0f} requests/s  {extract['retries']} retries ({extract['throttled']} x 429)")
+
+        elapsed, peak_mb = run_step('etl_db_trusted', [os.path.join(REPO_DIR, 'etl_db_trusted.py')], env, work_dir)
+        trusted_rows = sum(
+            json.load(open(os.path.join(work_dir, name)))['rows_written'].get('trusted.collection_game_data', 0)
+            for name in os.listdir(work_dir) if name.startswith('etl_db_trusted_') and name.endswith('.json')
+        )
+        results['etl_db_trusted'] = {'seconds': round(elapsed, 3), 'peak_rss_mb': round(peak_mb, 1), 'rows': trusted_rows}
+
+        print(f"etl_db_trusted   {elapsed:8.2f}s  {peak_mb:8.1f} MB peak  {trusted_rows / elapsed:10,.0f} rows/s")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {args.json}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import random
+import argparse
+import pandas as pd
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.transform import build_game_frame, build_achievement_counts, join_achievement_counts
+
+#---------------------- TRANSFORM MICRO-BENCHMARK ----------------------#
+#
+# Compares the former per-row lambdas with the vectorized transforms on a
+# synthetic payload, without any network access:
+#
+#   python benchmarks/bench_transform.py --games 100000 --users 200
+
+
+def synthetic_payloads(n_games, n_users, achievements_per_game, seed=42):
+    """
+    Build GetOwnedGames and GetPlayerAchievements payloads spread over several users.
+    """
+
+    rng = random.Random(seed)
+    per_user = max(1, n_games // n_users)
+
+    users = []
+    for u in range(n_users):
+        steam_user_id = str(76561190000000000 + u)
+        games = []
+        payloads = []
+        for appid in range(10 + u, 10 + u + per_user):
+            games.append({
+                'appid': appid,
+                'name': f'Game {appid}',
+                'playtime_forever': rng.randint(0, 5000),
+                'img_icon_url': f'{appid:040x}',
+                'has_community_visible_stats': True,
+                'rtime_last_played': rng.randint(1_400_000_000, 1_750_000_000),
+                'playtime_2weeks': rng.choice([0, 30, 120]),
+            })
+            payloads.append({
+                'steamID': steam_user_id,
+                'gameName': f'Game {appid}',
+                'appid': appid,
+                'achievements': [
+                    {'apiname': f'ACH_{i}', 'achieved': int(rng.random() < 0.4), 'unlocktime': rng.randint(0, 1_750_000_000)}
+                    for i in range(achievements_per_game)
+                ],
+            })
+        users.append((steam_user_id, games, payloads))
+
+    return users
+
+
+def legacy_transform(steam_user_id, games, payloads):
+    """
+    The transform as it was written in main.py, kept as the baseline.
+    """
+
+    df_game_information = pd.DataFrame(games)
+    df_game_information['steam_player_id'] = steam_user_id
+    df_game_information_filtered = df_game_information[df_game_information['playtime_forever'] > 0]
+
+    df_game_information_final = pd.DataFrame(
+        {
+            'steam_user_id': df_game_information_filtered['steam_player_id'],
+            'steam_game_id': df_game_information_filtered['appid'],
+            'last_played_timestamp': df_game_information_filtered['rtime_last_played'].apply(lambda x: datetime.fromtimestamp(x)),
+            'playtime_forever': df_game_information_filtered['playtime_forever'],
+        }
+    )
+
+    df_achievements = pd.DataFrame(payloads)
+
+    df_achievements_raw = pd.DataFrame(
+        {
+            'steam_game_id': df_achievements['appid'],
+            'total_game_acheivements': df_achievements['achievements'].apply(lambda x: len(x) if isinstance(x, list) else 0),
+            'total_game_acheivements_unlocked': df_achievements['achievements'].apply(lambda x: sum(item['achieved'] for item in x) if isinstance(x, list) else 0)
+        }
+    )
+
+    return pd.merge(df_game_information_final, df_achievements_raw, on='steam_game_id', how='inner')
+
+
+def vectorized_transform(steam_user_id, games, payloads):
+    """
+    The path the pipeline runs for every user.
+    """
+
+    _, df_game_information_final = build_game_frame(games, steam_user_id)
+    df_achievements_raw = build_achievement_counts(payloads, steam_user_id)
+
+    return join_achievement_counts(df_game_information_final, df_achievements_raw)
+
+
+def vectorized_all_users(users):
+    """
+    Shape every user in a single pass: the per-call pandas overhead is paid once.
+    """
+
+    games = [game for _, user_games, _ in users for game in user_games]
+    game_owners = [steam_user_id for steam_user_id, user_games, _ in users for _ in user_games]
+    payloads = [payload for _, _, user_payloads in users for payload in user_payloads]
+    payload_owners = [steam_user_id for steam_user_id, _, user_payloads in users for _ in user_payloads]
+
+    _, df_game_information_final = build_game_frame(games, game_owners)
+    df_achievements_raw = build_achievement_counts(payloads, payload_owners)
+
+    return pd.merge(df_game_information_final, df_achievements_raw, on=['steam_user_id', 'steam_game_id'], how='inner')
+
+
+def run(label, transform, users, total_games):
+    start = time.perf_counter()
+    if transform is vectorized_all_users:
+        transform(users)
+    else:
+        for steam_user_id, games, payloads in users:
+            transform(steam_user_id, games, payloads)
+    elapsed = time.perf_counter() - start
+
+    print(f'{label:<22} {elapsed:8.2f}s  {total_games / elapsed:12,.0f} games/s')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the owned-games / achievements transform.')
+    parser.add_argument('--games', type=int, default=100000, help='Total number of games across all users')
+    parser.add_argument('--users', type=int, default=200, help='Number of users the games are spread over')
+    parser.add_argument('--achievements', type=int, default=25, help='Achievements per game')
+    args = parser.parse_args()
+
+    users = synthetic_payloads(args.games, args.users, args.achievements)
+    total_games = sum(len(games) for _, games, _ in users)
+
+    print(f'{total_games:,} games, {args.users} users, {args.achievements} achievements per game\n')
+
+    legacy = run('legacy (per user)', legacy_transform, users, total_games)
+    vectorized = run('vectorized (per user)', vectorized_transform, users, total_games)
+    batched = run('vectorized (all users)', vectorized_all_users, users, total_games)
+
+    print(f'\nspeed-up per user: {legacy / vectorized:.1f}x, all users in one pass: {legacy / batched:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+#---------------------- LOCAL STEAM API STAND-IN ----------------------#
+#
+# Serves synthetic answers for the endpoints used by the extractor, with
+# configurable latency and 429 injection, so the pipeline can be measured
+# without touching Steam:
+#
+#   python benchmarks/mock_steam.py --port 8765 --games 5000 --latency-ms 20 --rate-429 0.01
+#
+# then run the extractor with STEAM_API_BASE=http://127.0.0.1:8765 and
+# STEAM_STORE_BASE=http://127.0.0.1:8765 (benchmarks/bench_pipeline.py does it all).
+#
+# Every answer is derived from the ids in the request, so runs are reproducible:
+# every tenth appid has no achievement stats, every thirteenth is missing from the store.
+#
+# It also answers POST /v1/chat/completions with a canned completion, so the AI
+# tips can be tried with OPENAI_BASE_URL=http://127.0.0.1:8765/v1, and serves
+# a synthetic image for any path ending in .jpg (STEAM_MEDIA_BASE for icons).
+
+FIRST_APPID = 1000
+
+
+def steam_id_for(vanity_name):
+    return str(76561190000000000 + zlib.crc32(vanity_name.encode('utf-8')) % 1_000_000)
+
+
+class MockSteam:
+    """
+    Synthetic Steam data and the failure knobs shared by every request handler.
+    """
+
+    def __init__(self, games=1000, achievements=30, played_ratio=0.7, latency_ms=0.0, jitter_ms=0.0, rate_429=0.0, seed=42, media_base=None):
+        self.games = games
+        self.achievements = achievements
+        self.played_ratio = played_ratio
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rate_429 = rate_429
+        self.seed = seed
+        # Host of the avatar and header URLs handed out (e.g. this server, to download them offline)
+        self.avatar_base = media_base or 'https://avatars.steamstatic.com'
+        self.store_media_base = media_base or 'https://cdn.akamai.steamstatic.com'
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def rng(self, *keys):
+        return random.Random(f'{self.seed}:' + ':'.join(str(key) for key in keys))
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def resolve_vanity(self, params):
+        return 200, {'response': {'success': 1, 'steamid': steam_id_for(params['vanityurl'][0])}}
+
+    def player_summaries(self, params):
+        players = []
+        for steamid in params['steamids'][0].split(','):
+            rng = self.rng('player', steamid)
+            players.append({
+                'steamid': steamid,
+                'communityvisibilitystate': 3,
+                'profilestate': 1,
+                'personaname': f'bench_{steamid[-6:]}',
+                'profileurl': f'https://steamcommunity.com/profiles/{steamid}/',
+                'avatarhash': f'{zlib.crc32(steamid.encode()):040x}',
+                'avatarmedium': f'{self.avatar_base}/{zlib.crc32(steamid.encode()):040x}_medium.jpg',
+                'timecreated': rng.randint(1_200_000_000, 1_600_000_000),
+                'lastlogoff': rng.randint(1_700_000_000, 1_760_000_000),
+                'loccountrycode': rng.choice(['BR', 'US', 'DE', 'FR', 'JP']),
+            })
+        return 200, {'response': {'players': players}}
+
+    def owned_games(self, params):
+        steamid = params['steamid'][0]
+        rng = self.rng('games', steamid)
+        games = []
+        for appid in range(FIRST_APPID, FIRST_APPID + self.games):
+            played = rng.random() < self.played_ratio
+            games.append({
+                'appid': appid,
+                'name': f'Game {appid}',
+                'playtime_forever': rng.randint(1, 20000) if played else 0,
+                'img_icon_url': f'{appid:040x}',
+                'has_community_visible_stats': appid % 10 != 0,
+                'rtime_last_played': rng.randint(1_400_000_000, 1_760_000_000) if played else 0,
+                'playtime_2weeks': rng.choice([0, 0, 0, 30, 120]),
+                # Fields the extractor does not store, present in real answers
+                'playtime_windows_forever': rng.randint(0, 20000) if played else 0,
+                'playtime_mac_forever': 0,
+                'playtime_linux_forever': 0,
+                'playtime_deck_forever': 0,
+                'rtime_last_played_deck': 0,
+                'playtime_disconnected': 0,
+                'has_leaderboards': appid % 3 == 0,
+                'content_descriptorids': [2, 5] if appid % 7 == 0 else [],
+            })
+        return 200, {'response': {'game_count': len(games), 'games': games}}
+
+    def player_achievements(self, params):
+        appid = int(params['appid'][0])
+        steamid = params['steamid'][0]
+        if appid % 10 == 0:
+            return 400, {'playerstats': {'error': 'Requested app has no stats', 'success': False}}
+
+        rng = self.rng('achievements', steamid, appid)
+        achievements = [
+            {'apiname': f'ACH_{appid}_{i}', 'achieved': int(rng.random() < 0.4), 'unlocktime': rng.randint(0, 1_760_000_000)}
+            for i in range(appid % self.achievements + 1)
+        ]
+        return 200, {'playerstats': {'steamID': steamid, 'gameName': f'Game {appid}', 'achievements': achievements, 'success': True}}
+
+    def game_schema(self, params):
+        appid = int(params['appid'][0])
+        if appid % 10 == 0:
+            return 200, {'game': {}}
+
+        achievements = [
+            {'name': f'ACH_{appid}_{i}', 'displayName': f'Achievement {i}', 'description': f'Do thing {i} in game {appid}', 'hidden': 0}
+            for i in range(appid % self.achievements + 1)
+        ]
+        return 200, {'game': {'gameName': f'Game {appid}', 'availableGameStats': {'achievements': achievements}}}
+
+    def appdetails(self, params):
+        appid = params['appids'][0]
+        if int(appid) % 13 == 0:
+            return 200, {appid: {'success': False}}
+
+        rng = self.rng('store', appid)
+        return 200, {appid: {'success': True, 'data': {
+            'steam_appid': int(appid),
+            'name': f'Game {appid}',
+            'required_age': 0,
+            'is_free': rng.random() < 0.2,
+            'about_the_game': 'Lorem ipsum ' * 40,
+            'short_description': f'Synthetic game {appid}',
+            'supported_languages': 'English, Portuguese',
+            'header_image': f'{self.store_media_base}/steam/apps/{appid}/header.jpg?t=1700000000',
+            'website': None,
+            'developers': [rng.choice(['Valve', 'Studio A', 'Studio B', 'Indie Co'])],
+            'publishers': [rng.choice(['Valve', 'Publisher X', 'Publisher Y'])],
+            'genres': [{'id': str(g), 'description': f'Genre {g}'} for g in rng.sample(range(1, 12), 2)],
+            'categories': [{'id': c, 'description': f'Category {c}'} for c in rng.sample(range(1, 30), 3)],
+            'movies': [{'id': int(appid) * 10 + m, 'name': f'Trailer {m}', 'thumbnail': f'https://cdn.akamai.steamstatic.com/steam/apps/{appid}/movie{m}.jpg'} for m in range(2)],
+            # Large fields the extractor does not store, present in real answers
+            'detailed_description': '<h2 class="bb_tag">About</h2><p>' + 'Lorem ipsum dolor sit amet. ' * 120 + '</p>',
+            'pc_requirements': {'minimum': '<strong>Minimum:</strong><ul class="bb_ul">' + '<li>Requirement</li>' * 30 + '</ul>'},
+            'screenshots': [{'id': i, 'path_thumbnail': f'https://cdn.akamai.steamstatic.com/steam/apps/{appid}/ss_{i}.600x338.jpg'} for i in range(12)],
+            'release_date': {'coming_soon': False, 'date': '1 Jan, 2020'},
+        }}}
+
+    def chat_completion(self, body):
+        prompt = body['messages'][-1]['content']
+        return 200, {
+            'id': f'chatcmpl-{zlib.crc32(prompt.encode("utf-8")):08x}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model') or 'mock',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': f'Mock tips for a {len(prompt)} characters prompt.'},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 8, 'total_tokens': len(prompt) // 4 + 8},
+        }
+
+    def route(self, path):
+        routes = {
+            '/ISteamUser/ResolveVanityURL/v0001/': self.resolve_vanity,
+            '/ISteamUser/GetPlayerSummaries/v0002/': self.player_summaries,
+            '/IPlayerService/GetOwnedGames/v0001/': self.owned_games,
+            '/ISteamUserStats/GetPlayerAchievements/v0001/': self.player_achievements,
+            '/ISteamUserStats/GetSchemaForGame/v2/': self.game_schema,
+            '/api/appdetails': self.appdetails,
+        }
+        return routes.get(path) or routes.get(path.rstrip('/') + '/')
+
+
+def make_handler(mock):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes: without TCP_NODELAY every answer waits for a delayed ACK
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            endpoint = mock.route(parsed.path)
+            mock.count(parsed.path)
+
+            if mock.latency or mock.jitter:
+                time.sleep(mock.latency + random.uniform(0, mock.jitter))
+
+            if endpoint is None and parsed.path.endswith('.jpg'):
+                return self.reply_image(parsed.path)
+
+            if endpoint is None:
+                return self.reply(404, {})
+
+            if mock.rate_429 and random.random() < mock.rate_429:
+                mock.count('429')
+                return self.reply(429, {}, {'Retry-After': '1'})
+
+            try:
+                status, body = endpoint(parse_qs(parsed.query))
+            except (KeyError, ValueError):
+                status, body = 400, {}
+
+            self.reply(status, body)
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            mock.count(parsed.path)
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+            if parsed.path.rstrip('/') != '/v1/chat/completions':
+                return self.reply(404, {})
+
+            try:
+                status, payload = mock.chat_completion(body)
+            except (KeyError, IndexError):
+                status, payload = 400, {}
+
+            self.reply(status, payload)
+
+        def reply(self, status, body, headers=None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def reply_image(self, path):
+            # 8 to 64 KB of bytes derived from the path, sent in pieces like a CDN would
+            rng = mock.rng('image', path)
+            payload = rng.randbytes(rng.randint(8, 64) * 1024)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            for i in range(0, len(payload), 16 * 1024):
+                self.wfile.write(payload[i:i + 16 * 1024])
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(mock, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Steam Web API and store endpoints.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--games', type=int, default=1000, help='Games owned by every user')
+    parser.add_argument('--achievements', type=int, default=30, help='Maximum achievements per game')
+    parser.add_argument('--played-ratio', type=float, default=0.7, help='Share of owned games with playtime')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed latency added to every answer')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random latency added on top of --latency-ms')
+    parser.add_argument('--media-base', help='Base URL of avatars and headers (default: the Steam CDNs), e.g. this server')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Probability of answering 429 Too Many Requests')
+    args = parser.parse_args()
+
+    mock = MockSteam(args.games, args.achievements, args.played_ratio, args.latency_ms, args.jitter_ms, args.rate_429, media_base=args.media_base)
+    server = serve(mock, args.host, args.port)
+
+    print(f'Mock Steam API listening on http://{args.host}:{server.server_port}', flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(mock.counts, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,38 @@
-import pandas as pd
+import os
 import sqlite3
 
+from utilities.etl_state import get_rowid_range, set_watermark
+from utilities.metrics import instrument_run, record_rows, stage
+
 #---------------------- TURSTED DB FORMATION PROCESS ----------------------#
+#
+# The trusted layer is built with set-based upserts: the raw database is
+# attached to the trusted connection and every table is merged with a single
+# INSERT ... SELECT ... ON CONFLICT, inside one transaction. Raw rows are read
+# in rowid order so the latest snapshot wins, like the former row-by-row loop.
+# Each table keeps a rowid high-watermark, so a run only merges raw rows
+# appended since the previous one.
+#
+# The genres, categories and developers JSON of game_metadata are also
+# unpacked with json_each into indexed bridge tables (game_genre,
+# game_category, game_developer), queried by utilities/filters.py.
+
+RAW_DB_PATH = os.getenv('STEAM_RAW_DB', 'database/steam_data_raw.db')
+TRUSTED_DB_PATH = os.getenv('STEAM_TRUSTED_DB', 'database/steam_data_trusted.db')
+
+instrument_run('etl_db_trusted')
 
-conn_raw = sqlite3.connect('database/steam_data_raw.db')
-conn_trusted = sqlite3.connect('database/steam_data_trusted.db')
+conn_trusted = sqlite3.connect(TRUSTED_DB_PATH)
 
 cursor = conn_trusted.cursor()
 
+cursor.execute("PRAGMA journal_mode = WAL")
+cursor.execute("PRAGMA synchronous = NORMAL")
+cursor.execute("PRAGMA temp_store = MEMORY")
+cursor.execute("PRAGMA cache_size = -65536")
+
+cursor.execute("ATTACH DATABASE ? AS raw", (RAW_DB_PATH,))
+
         #---------- PROFILE USER TABLE ----------#
 
 try:
@@ -23,7 +48,7 @@ try:
             lastlogoff DATETIME,
             loccountrycode TEXT,
             avatarmedium TEXT,
-            dh_updated DATETIME,   
+            dh_updated DATETIME,
             PRIMARY KEY (steamid)
         )
     """
@@ -33,14 +58,10 @@ try:
 except Exception as e:
     print(f"An error occurred while creating the table: {e}")
 
-        #---------- GET DATA FROM RAW ----------#
-
-df_user_raw = pd.read_sql_query("SELECT * FROM profile_data", conn_raw)
-
         #---------- UPSERT OPERATION ----------#
 
 sql_upsert = """
-    INSERT INTO profile_data (
+    INSERT INTO main.profile_data (
         steamid,
         communityvisibilitystate,
         profilestate,
@@ -52,45 +73,42 @@ sql_upsert = """
         avatarmedium,
         dh_updated
     )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    SELECT
+        steamid,
+        communityvisibilitystate,
+        profilestate,
+        avatarhash,
+        profileurl,
+        timecreated,
+        lastlogoff,
+        loccountrycode,
+        avatarmedium,
+        dh_updated
+    FROM raw.profile_data
+    WHERE rowid > ? AND rowid <= ?
+    ORDER BY rowid
     ON CONFLICT(steamid) DO UPDATE SET
         dh_updated = excluded.dh_updated
 """
 
-try:
-    for row in df_user_raw.itertuples(index=False):
-        cursor.execute(sql_upsert, (
-            row.steamid,
-            row.communityvisibilitystate,
-            row.profilestate,
-            row.avatarhash,
-            row.profileurl,
-            row.timecreated,
-            row.lastlogoff,
-            row.loccountrycode,
-            row.avatarmedium,
-            row.dh_updated
-        ))
-    print("Upsert operation completed successfully.")
-except Exception as e:
-    print(f"An error occurred during the upsert operation: {e}")
+with stage('trusted.profile_data'):
+    try:
+        low, high = get_rowid_range(cursor, 'trusted.profile_data', 'raw.profile_data')
+        cursor.execute(sql_upsert, (low, high))
+        rows_processed = cursor.rowcount
+        record_rows('trusted.profile_data', rows_processed)
+        set_watermark(cursor, 'trusted.profile_data', high)
+        print(f"Upsert operation completed successfully. {rows_processed} new raw rows processed.")
+    except Exception as e:
+        print(f"An error occurred during the upsert operation: {e}")
 
 #---------------------------------------------------------------------------------------------
 
-
-
-
-
-
-
-
-
-
         #---------- COLLECTION GAME TABLE ----------#
 
 try:
     sql_collection_game_data = """
-        CREATE TABLE IF NOT EXISTS collection_game_data 
+        CREATE TABLE IF NOT EXISTS collection_game_data
         (
             steam_user_id TEXT,
             steam_game_id TEXT,
@@ -111,16 +129,10 @@ try:
 except Exception as e:
     print(f"An error occurred while creating the table: {e}")
 
-        #---------- GET DATA FROM RAW ----------#
-
-df_game_collection_raw = pd.read_sql_query("SELECT * FROM collection_game_data", conn_raw)
-
-#print(df_game_collection_raw.dtypes)
-
         #---------- UPSERT OPERATION ----------#
 
 sql_upsert = """
-    INSERT INTO collection_game_data (
+    INSERT INTO main.collection_game_data (
         steam_user_id,
         steam_game_id,
         name,
@@ -132,36 +144,42 @@ sql_upsert = """
         total_game_acheivements,
         total_game_acheivements_unlocked
     )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    SELECT
+        steam_user_id_x,
+        steam_game_id,
+        name,
+        last_played_timestamp,
+        playtime_forever,
+        img_game_cover_url,
+        playtime_2weeks,
+        dh_updated,
+        total_game_acheivements,
+        total_game_acheivements_unlocked
+    FROM raw.collection_game_data
+    WHERE rowid > ? AND rowid <= ?
+    ORDER BY rowid
     ON CONFLICT(steam_user_id, steam_game_id) DO UPDATE SET
-        dh_updated = excluded.dh_updated
+        name = excluded.name,
+        last_played_timestamp = excluded.last_played_timestamp,
+        playtime_forever = excluded.playtime_forever,
+        img_game_cover_url = excluded.img_game_cover_url,
+        playtime_2weeks = excluded.playtime_2weeks,
+        dh_updated = excluded.dh_updated,
+        total_game_acheivements = excluded.total_game_acheivements,
+        total_game_acheivements_unlocked = excluded.total_game_acheivements_unlocked
+    WHERE excluded.dh_updated >= collection_game_data.dh_updated
 """
 
-try:
-    for row in df_game_collection_raw.itertuples(index=False):
-        cursor.execute(sql_upsert, (
-            row.steam_user_id_x,
-            row.steam_game_id,
-            row.name,
-            row.last_played_timestamp,
-            row.playtime_forever,
-            row.img_game_cover_url,
-            row.playtime_2weeks,
-            row.dh_updated,
-            row.total_game_acheivements,
-            row.total_game_acheivements_unlocked
-        ))
-    print("Upsert operation completed successfully.")
-except Exception as e:
-    print(f"An error occurred during the upsert operation: {e}")
-
-
-
-
-
-
-
-
+with stage('trusted.collection_game_data'):
+    try:
+        low, high = get_rowid_range(cursor, 'trusted.collection_game_data', 'raw.collection_game_data')
+        cursor.execute(sql_upsert, (low, high))
+        rows_processed = cursor.rowcount
+        record_rows('trusted.collection_game_data', rows_processed)
+        set_watermark(cursor, 'trusted.collection_game_data', high)
+        print(f"Upsert operation completed successfully. {rows_processed} new raw rows processed.")
+    except Exception as e:
+        print(f"An error occurred during the upsert operation: {e}")
 
         #---------- GAME METADATA TABLE ----------#
 
@@ -193,14 +211,10 @@ try:
 except Exception as e:
     print(f"An error occurred while creating the table: {e}")
 
-        #---------- GET DATA FROM RAW ----------#
-
-df_game_metadata_raw = pd.read_sql_query("SELECT * FROM game_metadata", conn_raw)
-
         #---------- UPSERT OPERATION ----------#
 
 sql_upsert = """
-    INSERT INTO game_metadata (
+    INSERT INTO main.game_metadata (
         steam_game_id,
         name,
         required_age,
@@ -218,37 +232,130 @@ sql_upsert = """
         media,
         dh_updated
     )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    SELECT
+        steam_game_id,
+        name,
+        required_age,
+        is_free,
+        dlc,
+        about_the_game,
+        short_description,
+        supported_languages,
+        header_image,
+        website,
+        developers,
+        publishers,
+        genres,
+        categories,
+        media,
+        dh_updated
+    FROM raw.game_metadata
+    WHERE rowid > ? AND rowid <= ?
+    ORDER BY rowid
     ON CONFLICT(steam_game_id) DO UPDATE SET
         dh_updated = excluded.dh_updated
 """
 
-for row in df_game_metadata_raw.itertuples(index=False):
+with stage('trusted.game_metadata'):
     try:
-        cursor.execute(sql_upsert, (
-            row.steam_game_id,
-            row.name,
-            row.required_age,
-            row.is_free,
-            row.dlc,
-            row.about_the_game,
-            row.short_description,
-            row.supported_languages,
-            row.header_image,
-            row.website,
-            row.developers,
-            row.publishers,
-            row.genres,
-            row.categories,
-            row.media,
-            row.dh_updated          
-        ))
+        low, high = get_rowid_range(cursor, 'trusted.game_metadata', 'raw.game_metadata')
+        cursor.execute(sql_upsert, (low, high))
+        rows_processed = cursor.rowcount
+        record_rows('trusted.game_metadata', rows_processed)
+        set_watermark(cursor, 'trusted.game_metadata', high)
+        print(f"Upsert operation completed successfully. {rows_processed} new raw rows processed.")
     except Exception as e:
         print(f"An error occurred during the upsert operation{e}")
 
+        #---------- GAME BRIDGE TABLES ----------#
+
+try:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS game_genre
+        (
+            steam_game_id TEXT,
+            genre_id TEXT,
+            genre TEXT COLLATE NOCASE,
+            PRIMARY KEY (steam_game_id, genre_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS game_category
+        (
+            steam_game_id TEXT,
+            category_id TEXT,
+            category TEXT COLLATE NOCASE,
+            PRIMARY KEY (steam_game_id, category_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS game_developer
+        (
+            steam_game_id TEXT,
+            developer TEXT COLLATE NOCASE,
+            PRIMARY KEY (steam_game_id, developer)
+        )
+    """)
+
+    # Filters start from the attribute and join the games of every user on steam_game_id
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_genre_genre ON game_genre (genre, steam_game_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_category_category ON game_category (category, steam_game_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_developer_developer ON game_developer (developer, steam_game_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_collection_game_data_game ON collection_game_data (steam_game_id)")
+    print("Bridge tables 'game_genre', 'game_category' and 'game_developer' created successfully or already exist.")
+except Exception as e:
+    print(f"An error occurred while creating the bridge tables: {e}")
+
+        #---------- REBUILD BRIDGES OF THE NEW RAW GAMES ----------#
+
+# Latest raw row of every game appended since the last run: its bridge rows are replaced as a whole
+sql_bridge_source = """
+    CREATE TEMP TABLE bridge_source AS
+    SELECT g.steam_game_id, g.genres, g.categories, g.developers
+    FROM raw.game_metadata g
+    WHERE g.rowid > ? AND g.rowid <= ?
+    AND g.rowid = (SELECT MAX(m.rowid) FROM raw.game_metadata m WHERE m.steam_game_id = g.steam_game_id AND m.rowid <= ?)
+"""
+
+sql_bridge_inserts = {
+    'game_genre': """
+        INSERT OR IGNORE INTO main.game_genre (steam_game_id, genre_id, genre)
+        SELECT s.steam_game_id, json_extract(j.value, '$.id'), json_extract(j.value, '$.description')
+        FROM temp.bridge_source s, json_each(CASE WHEN json_valid(s.genres) THEN s.genres END) j
+    """,
+    'game_category': """
+        INSERT OR IGNORE INTO main.game_category (steam_game_id, category_id, category)
+        SELECT s.steam_game_id, json_extract(j.value, '$.id'), json_extract(j.value, '$.description')
+        FROM temp.bridge_source s, json_each(CASE WHEN json_valid(s.categories) THEN s.categories END) j
+    """,
+    'game_developer': """
+        INSERT OR IGNORE INTO main.game_developer (steam_game_id, developer)
+        SELECT s.steam_game_id, j.value
+        FROM temp.bridge_source s, json_each(CASE WHEN json_valid(s.developers) THEN s.developers END) j
+    """,
+}
+
+with stage('trusted.game_bridges'):
+    try:
+        low, high = get_rowid_range(cursor, 'trusted.game_bridges', 'raw.game_metadata')
+        cursor.execute("DROP TABLE IF EXISTS temp.bridge_source")
+        cursor.execute(sql_bridge_source, (low, high, high))
+
+        for table_name, sql_insert in sql_bridge_inserts.items():
+            cursor.execute(f"DELETE FROM main.{table_name} WHERE steam_game_id IN (SELECT steam_game_id FROM temp.bridge_source)")
+            cursor.execute(sql_insert)
+            record_rows(f'trusted.{table_name}', cursor.rowcount)
+
+        cursor.execute("DROP TABLE temp.bridge_source")
+        set_watermark(cursor, 'trusted.game_bridges', high)
+        print(f"Bridge tables rebuilt for the games of {high - low} new raw rows.")
+    except Exception as e:
+        print(f"An error occurred while rebuilding the bridge tables: {e}")
+
 
+with stage('trusted.commit'):
+    conn_trusted.commit()
 
-conn_trusted.commit()
+cursor.execute("DETACH DATABASE raw")
 
-conn_raw.close()
-conn_trusted.close()
\ No newline at end of file
+conn_trusted.close()
@@ -1,22 +1,28 @@
-import pandas as pd
 import os
-from tqdm import tqdm
 from datetime import datetime
 from dotenv import load_dotenv
 #from fpdf import FPDF
 #from PIL import Image
 #from io import BytesIO
 
-from utilities.defs import get_user_id_by_vanity, get_user_info, get_owned_games, get_game_achievements, save_file_opt, ai_achievement_breakdown, save_to_sqlite, extract_game_metadatas
+from utilities.steam_api import get_user_id_by_vanity
+from utilities.exporters import save_file_opt
+from utilities.storage import save_to_sqlite
+from utilities.pipeline import extract_user_profile, extract_user_games, extract_metadata
+from utilities.metrics import instrument_run, stage
 
 load_dotenv()
 
+instrument_run('main')
+
 #76561199490364483 neto
 #76561197985622277 theo
 
 #------------------------------------Generic info
 API_KEY = os.getenv('API_KEY')
 ai_api_key=os.getenv("GPT_API_KEY")
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', 8))
+INCREMENTAL_MODE = os.getenv('INCREMENTAL_MODE', 'false').lower() == 'true'
 #------------------------------------user identification
 
 steam_user_id = get_user_id_by_vanity(API_KEY)
@@ -31,121 +37,29 @@ print("Start extracting information...")
 
 #------------------------------------Get all user informations by steam id
 
-players_info = get_user_info(steam_user_id, API_KEY).get('response').get('players')[0]
-
-df_steam_user = pd.DataFrame([players_info])
-
-df_user_final = pd.DataFrame(
-    {
-    'steamid': df_steam_user['steamid'],
-    'communityvisibilitystate': df_steam_user['communityvisibilitystate'],
-    'profilestate': df_steam_user['profilestate'],
-    'avatarhash': df_steam_user['avatarhash'],
-    'personaname': df_steam_user['personaname'] if 'personaname' in df_steam_user.columns else None,
-    'profileurl': df_steam_user['profileurl'],
-    'timecreated': df_steam_user['timecreated'].apply(lambda x: datetime.fromtimestamp(x)) if 'timecreated' in df_steam_user.columns else None,
-    'lastlogoff': df_steam_user['lastlogoff'].apply(lambda x : datetime.fromtimestamp(x)) if 'lastlogoff' in df_steam_user.columns else None,
-    'loccountrycode': df_steam_user['loccountrycode'] if 'loccountrycode' in df_steam_user.columns else None,
-    'avatarmedium': df_steam_user['avatarmedium'],
-    'dh_updated': datetime.now()
-    }
-)
+with stage('extract_user_profile'):
+    df_user_final = extract_user_profile(steam_user_id, API_KEY)
+
+if df_user_final is None:
+    print(f'Error fetching user information for Steam ID {steam_user_id}. Please check the ID or your API key.')
+    exit()
 
 if df_user_final['communityvisibilitystate'].iloc[0] != 3:
     print(f'{df_user_final['personaname']} profile is private, cannot fetch games. Please make it public to continue.')
     exit()
 
-#------------------------------------Get list of owned games
+#------------------------------------Get list of owned games and achievements
 
-games_info = get_owned_games(steam_user_id, API_KEY).get('response').get('games')
+with stage('extract_user_games'):
+    df_final = extract_user_games(steam_user_id, API_KEY, max_workers=MAX_WORKERS, incremental=INCREMENTAL_MODE)
 
-if games_info is None:
-    print(f'No games found for Steam ID {steam_user_id}. Please check the ID or if you profile is public.')
+if df_final is None:
     exit()
 
-df_game_information = pd.DataFrame(games_info)
-
-df_game_information['steam_player_id'] = steam_user_id
-df_game_information_filtered = df_game_information[df_game_information['playtime_forever'] > 0]
-
-df_game_information_final = pd.DataFrame(
-    {
-        'steam_user_id': df_game_information_filtered['steam_player_id'],
-        'steam_game_id': df_game_information_filtered['appid'],
-        'name': df_game_information_filtered['name'],
-        'last_played_timestamp': df_game_information_filtered['rtime_last_played'].apply(lambda x: datetime.fromtimestamp(x)) if 'rtime_last_played' in df_game_information_filtered.columns else None,
-        'playtime_forever': df_game_information_filtered['playtime_forever'],
-        'img_game_cover_url': df_game_information_filtered['img_icon_url'],
-        'has_community_visible_stats': df_game_information_filtered['has_community_visible_stats'],
-        'playtime_2weeks': df_game_information_filtered['playtime_2weeks'] if 'playtime_2weeks' in df_game_information_filtered.columns else None,
-        'dh_updated': datetime.now()
-    } 
-)
-
-#------------------------------------#Get list of game achievements #
-
-collect_achievements_info = []
-no_information_games = []
-
-for indesx, game in tqdm(df_game_information_final.iterrows(), desc="Fetching achievements", total=len(df_game_information_final), ncols=100):
-    selected_appid = game['steam_game_id']
-
-    game_achievements_url = f'http://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v0001/?appid={selected_appid}&key={API_KEY}&steamid={steam_user_id}'
-
-    acheivements_json = get_game_achievements(steam_user_id, API_KEY, selected_appid )
-
-    if acheivements_json is None:
-        no_information_games.append(selected_appid)
-        continue
-    else:
-        acheivements_info = acheivements_json.get('playerstats')
-    
-    acheivements_info['appid'] = selected_appid
-    
-    collect_achievements_info.append(acheivements_info)
-
-
-df_achievements  = pd.DataFrame(collect_achievements_info)
-print(f'\ntotal games whith no achievements: {len(no_information_games)}')
-
-
-df_achievements_raw = pd.DataFrame(
-    {
-        'steam_user_id': df_achievements['steamID'],
-        'steam_game_id': df_achievements['appid'],
-        'appid': df_achievements['gameName'],
-        'total_game_acheivements': df_achievements['achievements'].apply(lambda x: len(x) if isinstance(x, list) else 0),
-        'total_game_acheivements_unlocked': df_achievements['achievements'].apply(lambda x: sum(item['achieved'] for item in x) if isinstance(x, list) else 0)
-    }
-)
-#--------------------------------------------------- Joining dataframes
-
-df_achievements_final = df_achievements_raw.drop_duplicates(subset=['steam_game_id'])
-
-df_game_status = pd.merge(df_game_information_final, df_achievements_final, on='steam_game_id', how='inner')
-
-df_final = df_game_status.drop(columns=['steam_user_id_y', 'has_community_visible_stats','appid'])
-
 #------------------------------------#Extract game metadatas 
 
-game_set = df_final['steam_game_id'].unique().tolist()
-
-str_list = []  
-
-for item in game_set:
-    str_list.append(str(item))
-
-try:
-    print('\nExtracting game metadatas for game data enrichment')
-    df_game_metadata, num_not_found = extract_game_metadatas(str_list)
-
-    # dh_updated added to metadata dataframe
-    df_game_metadata['dh_updated'] = datetime.now()
-
-    print(f'Total games with no metadata found: {num_not_found}, {num_not_found/len(str_list)*100:.2f}%')
-except Exception as e:
-    print(f'Error extracting game metadatas: {e}')
-    df_game_metadata, num_not_found = None, 0
+with stage('extract_metadata'):
+    df_game_metadata = extract_metadata(df_final['steam_game_id'].unique().tolist())
 
 #------------------------------------#options for user
 
@@ -171,10 +85,18 @@ if action == 1:
     save_file_opt(df_final, file_name)
     print(f"Data saved successfully as {file_name}.")
 
+#------------------------------------#Images for the personal documentation #
+
+if action == 2:
+    from utilities.assets import collect_assets, download_assets, ASSET_DIR
+    counts = download_assets(collect_assets(df_user_final, df_final, df_game_metadata), max_workers=MAX_WORKERS)
+    print(f"Images: {counts['downloaded']} downloaded, {counts['skipped']} already stored, {counts['failed']} failed, in {ASSET_DIR}.")
+
 #------------------------------------#Chat gpt to searching not unlock achievements #
 
 if action == 3:
-    ai_achievement_breakdown(ai_api_key, steam_user_id, API_KEY)
+    from utilities.ai import ai_achievement_breakdown
+    ai_achievement_breakdown(ai_api_key, steam_user_id, API_KEY, game_df=df_final)
     
 #------------------------------------#Save data to local sqlite database #
 
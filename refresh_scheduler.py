@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+from batch_extract import read_users, resolve_users
+from utilities.storage import save_to_sqlite
+from utilities.pipeline import extract_user_profiles, extract_user_games
+from utilities.raw_schema import connect_raw, ensure_raw_table
+from utilities.scheduler import RefreshScheduler, SystemClock, SimulatedClock, DAILY_API_BUDGET, api_request_count
+from utilities.metrics import instrument_run
+
+#---------------------- ACTIVITY-AWARE REFRESH DAEMON ----------------------#
+#
+# Keeps the tracked users fresh without re-extracting idle profiles on every
+# run: active players are refreshed every few hours, dormant ones every couple
+# of weeks, within the daily Web API budget of the key (see utilities/scheduler.py).
+#
+#   python refresh_scheduler.py --file users.txt
+#   python refresh_scheduler.py                          (every user of the raw database)
+#   python refresh_scheduler.py --simulate-days 30       (replay a month on a simulated clock, no request)
+
+load_dotenv()
+
+API_KEY = os.getenv('API_KEY')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Refresh tracked Steam users by activity, within a daily API budget.')
+    parser.add_argument('users', nargs='*', help='Steam IDs or vanity names (default: every user of the raw database)')
+    parser.add_argument('--file', help='Text file with one Steam ID or vanity name per line')
+    parser.add_argument('--budget', type=int, default=DAILY_API_BUDGET, help='Web API requests allowed per UTC day')
+    parser.add_argument('--batch-size', type=int, default=20, help='Maximum users refreshed per tick')
+    parser.add_argument('--poll', type=float, default=300, help='Maximum seconds between two ticks')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MAX_WORKERS', 8)), help='Concurrent achievement requests per user')
+    parser.add_argument('--cdc', action='store_true', help='Write only rows that changed since the stored version')
+    parser.add_argument('--simulate-days', type=float, help='Replay this many days on a simulated clock, without any request or write')
+    return parser.parse_args()
+
+
+def tracked_users(args):
+    users = read_users(args)
+
+    if users:
+        return resolve_users(users, max_workers=args.workers)
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'profile_data')
+    steam_ids = [row[0] for row in conn.execute("SELECT DISTINCT steamid FROM profile_data")]
+    conn.close()
+
+    return steam_ids
+
+
+def make_refresh(args):
+    raw_method = 'cdc' if args.cdc else 'append'
+
+    def refresh(steam_user_ids):
+        """
+        Extract profiles and games of a batch of users. Returns the Web API requests made.
+        """
+
+        before = api_request_count()
+
+        df_profiles = extract_user_profiles(steam_user_ids, API_KEY)
+
+        if df_profiles is None:
+            return api_request_count() - before
+
+        save_to_sqlite(df_profiles, table_name='profile_data', method=raw_method)
+        public_ids = set(df_profiles.loc[df_profiles['communityvisibilitystate'] == 3, 'steamid'])
+
+        for steam_user_id in steam_user_ids:
+            if steam_user_id not in public_ids:
+                continue
+
+            df_final = extract_user_games(steam_user_id, API_KEY, max_workers=args.workers, incremental=True, show_progress=False)
+
+            if df_final is not None:
+                save_to_sqlite(df_final, table_name='collection_game_data', method=raw_method)
+
+        return api_request_count() - before
+
+    return refresh
+
+
+def simulate(args, steam_ids):
+    """
+    Run the scheduler on a simulated clock with estimated costs, and print what every day would refresh.
+    """
+
+    clock = SimulatedClock()
+    scheduler = RefreshScheduler(
+        steam_ids,
+        refresh=lambda batch: sum(scheduler.schedule[steam_user_id]['cost'] for steam_user_id in batch),
+        clock=clock,
+        state_conn=sqlite3.connect(':memory:'),
+        daily_budget=args.budget,
+        batch_size=args.batch_size
+    )
+
+    days = {}
+
+    def on_refresh(now, batch):
+        day = days.setdefault(datetime.fromtimestamp(now, tz=timezone.utc).strftime('%Y-%m-%d'), {})
+        for steam_user_id in batch:
+            tier = scheduler.schedule[steam_user_id]['tier']
+            day[tier] = day.get(tier, 0) + 1
+
+    scheduler.run(until=clock.now() + args.simulate_days * 86400, poll_interval=args.poll, on_refresh=on_refresh)
+
+    print(f"\n{'day':<12} {'requests':>9} {'active':>7} {'recent':>7} {'idle':>7} {'dormant':>8}")
+    for day, tiers in sorted(days.items()):
+        used = scheduler.state_conn.execute("SELECT requests FROM api_budget WHERE day = ?", (day,)).fetchone()[0]
+        print(f"{day:<12} {used:>9,} {tiers.get('active', 0):>7} {tiers.get('recent', 0):>7} {tiers.get('idle', 0):>7} {tiers.get('dormant', 0):>8}")
+
+
+def main():
+    args = parse_args()
+
+    steam_ids = tracked_users(args)
+
+    if not steam_ids:
+        print('No Steam IDs to track.')
+        return
+
+    print(f'Tracking {len(steam_ids)} users, daily Web API budget {args.budget:,} requests.')
+
+    if args.simulate_days:
+        simulate(args, steam_ids)
+        return
+
+    instrument_run('refresh_scheduler')
+
+    scheduler = RefreshScheduler(steam_ids, refresh=make_refresh(args), clock=SystemClock(), daily_budget=args.budget, batch_size=args.batch_size)
+
+    def on_refresh(now, batch):
+        used = scheduler.used_budget(now)
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] refreshed {len(batch)} users, {used:,}/{args.budget:,} requests used today")
+
+    try:
+        scheduler.run(poll_interval=args.poll, on_refresh=on_refresh)
+    except KeyboardInterrupt:
+        print('\nStopped.')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,66 +1,115 @@
+import os
 import pandas as pd
 import sqlite3
 
-# ----------------- Connect to the SQLite database -----------------
+from utilities.etl_state import get_rowid_range, set_watermark
+from utilities.raw_schema import ensure_raw_table
 
-conn = sqlite3.connect('database\steam_data_raw.db')
+# Only raw rows appended since the previous run are read: their watermarks are
+# stored in the trusted database, next to the tables they feed. The latest
+# snapshot of each user is selected in SQL, through the raw indexes on
+# (steam_user_id_x, dh_updated) and (steamid, dh_updated).
+
+RAW_DB_PATH = os.getenv('STEAM_RAW_DB', 'database/steam_data_raw.db')
+TRUSTED_DB_PATH = os.getenv('STEAM_TRUSTED_DB', 'database/steam_data_trusted.db')
+
+# ----------------- Connect to the SQLite databases -----------------
+
+conn = sqlite3.connect(TRUSTED_DB_PATH)
 
 cursor = conn.cursor()
 
+cursor.execute("ATTACH DATABASE ? AS raw", (RAW_DB_PATH,))
+
+ensure_raw_table(conn, 'collection_game_data', schema='raw')
+ensure_raw_table(conn, 'profile_data', schema='raw')
+conn.commit()
+
 # ----------------- Query definition -----------------
 
+# New rows that are still current. Rows saved in CDC mode (row_hash set) only hold the
+# games that changed and are merged per (user, game); appended snapshots are complete
+# and replace the user: their latest snapshot is found with one index seek per user.
 game_query = """
-    SELECT * from collection_game_data
+    SELECT steam_user_id_x, steam_game_id, name, last_played_timestamp, playtime_forever,
+           img_game_cover_url, playtime_2weeks, dh_updated, total_game_acheivements,
+           total_game_acheivements_unlocked, row_hash IS NOT NULL AS is_cdc
+    FROM raw.collection_game_data g
+    WHERE g.rowid > ? AND g.rowid <= ?
+    AND g.valid_to IS NULL
+    AND (
+        g.row_hash IS NOT NULL
+        OR g.dh_updated = (
+            SELECT MAX(m.dh_updated) FROM raw.collection_game_data m
+            WHERE m.steam_user_id_x = g.steam_user_id_x AND m.row_hash IS NULL
+        )
+    )
 """
 
+# Latest profile row of every user with new rows
 user_query = """
-    SELECT * from profile_data
+    SELECT steamid, communityvisibilitystate, profilestate, avatarhash, personaname, profileurl,
+           timecreated, lastlogoff, loccountrycode, avatarmedium, dh_updated
+    FROM (
+        SELECT p.*, ROW_NUMBER() OVER (PARTITION BY p.steamid ORDER BY p.dh_updated DESC, p.rowid DESC) AS snapshot_rank
+        FROM raw.profile_data p
+        WHERE p.rowid > ? AND p.rowid <= ?
+        AND p.valid_to IS NULL
+    )
+    WHERE snapshot_rank = 1
 """
 
 # ----------------- Query Execution -----------------
 
-cursor.execute(game_query)
+game_low, game_high = get_rowid_range(cursor, 'steam_etl.collection_game_data', 'raw.collection_game_data')
+user_low, user_high = get_rowid_range(cursor, 'steam_etl.profile_data', 'raw.profile_data')
+
+cursor.execute(game_query, (game_low, game_high))
 game_data = cursor.fetchall()
 
 game_data_columns = [g_description[0] for g_description in cursor.description]
 
-cursor.execute(user_query)
+cursor.execute(user_query, (user_low, user_high))
 user_data = cursor.fetchall()
 
 user_data_columns = [u_description[0] for u_description in cursor.description]
 
 # ----------------- Datafram shapping -----------------
 
-df_game_data = pd.DataFrame(game_data, columns=game_data_columns)
+df_game_information_filtered = pd.DataFrame(game_data, columns=game_data_columns)
+is_cdc = df_game_information_filtered.pop('is_cdc').astype(bool)
 df_user_data = pd.DataFrame(user_data, columns=user_data_columns)
 
-# ----------------- Data Cleaning -----------------
-
-df_user_data = df_user_data.sort_values(by='dh_updated', ascending=True)
-
-df_user_data = df_user_data.drop_duplicates(subset=['steamid'], keep='last')
-
-last_game_insert = df_game_data.groupby('steam_user_id_x')['dh_updated'].max().reset_index()
-
-df_game_information_filtered = pd.merge(df_game_data, last_game_insert, left_on=['steam_user_id_x', 'dh_updated'], right_on=['steam_user_id_x', 'dh_updated'], how='inner')
+print(f'{len(df_game_information_filtered)} latest game rows and {len(df_user_data)} latest profile rows since the last run.')
 
 print(df_game_information_filtered.dtypes)
 
-# ----------------- Close first connection -----------------
-
-conn.close()
-
 # ----------------- Clean data deployed do db -----------------
 
-conn = sqlite3.connect('database\steam_data_trusted.db')
+# First run: rebuild the tables. Later runs: replace only the users with a newer snapshot,
+# or only the games that changed for rows saved in CDC mode.
 
-cursor = conn.cursor()
-
-# -----------------  Write cleaned data to the trusted database -----------------
-
-df_user_data.to_sql('profile_data', conn, if_exists='replace', index=False)
-df_game_information_filtered.to_sql('collection_game_data', conn, if_exists='replace', index=False)
+if user_low == 0:
+    df_user_data.to_sql('profile_data', conn, if_exists='replace', index=False)
+elif not df_user_data.empty:
+    cursor.executemany("DELETE FROM main.profile_data WHERE steamid = ?", [(steamid,) for steamid in df_user_data['steamid']])
+    df_user_data.to_sql('profile_data', conn, if_exists='append', index=False)
 
+if game_low == 0:
+    df_game_information_filtered.to_sql('collection_game_data', conn, if_exists='replace', index=False)
+elif not df_game_information_filtered.empty:
+    df_snapshots = df_game_information_filtered[~is_cdc]
+    df_changes = df_game_information_filtered[is_cdc]
+    cursor.executemany("DELETE FROM main.collection_game_data WHERE steam_user_id_x = ?", [(user,) for user in df_snapshots['steam_user_id_x'].unique()])
+    cursor.executemany(
+        "DELETE FROM main.collection_game_data WHERE steam_user_id_x = ? AND steam_game_id = ?",
+        zip(df_changes['steam_user_id_x'].tolist(), df_changes['steam_game_id'].tolist())
+    )
+    df_game_information_filtered.to_sql('collection_game_data', conn, if_exists='append', index=False)
 
+set_watermark(cursor, 'steam_etl.profile_data', user_high)
+set_watermark(cursor, 'steam_etl.collection_game_data', game_high)
 
+conn.commit()
 
+conn.close()
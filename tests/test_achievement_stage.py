@@ -0,0 +1,98 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities import raw_schema, storage
+from utilities.checkpoint import DONE
+from utilities.pipeline import _settled_appids
+
+#---------------------- ACHIEVEMENT STAGE RESUME ----------------------#
+#
+#   python -m unittest discover tests
+
+STEAM_USER_ID = '76561190000000001'
+
+
+def achievement_answer(appid):
+    return {
+        'playerstats': {
+            'steamID': STEAM_USER_ID,
+            'gameName': f'Game {appid}',
+            'success': True,
+            'achievements': [
+                {'apiname': f'ACH_{i}', 'achieved': int(i < 2), 'unlocktime': 0}
+                for i in range(4)
+            ],
+        }
+    }
+
+
+class FakeAchievements:
+    """
+    Stand-in for iter_game_achievements that records the appids requested.
+    """
+
+    def __init__(self):
+        self.requested = []
+
+    def __call__(self, steam_user_id, api_key, appid_list, max_workers=8):
+        self.requested.extend(appid_list)
+        for appid in appid_list:
+            yield appid, achievement_answer(appid)
+
+
+class AchievementStageResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'raw.db')
+        patcher = mock.patch.object(raw_schema, 'RAW_DB_PATH', self.db_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def crawl(self, appids):
+        fake = FakeAchievements()
+        with mock.patch.object(storage, 'iter_game_achievements', fake):
+            storage.stream_achievements_to_stage(STEAM_USER_ID, 'key', appids, chunk_size=2, show_progress=False)
+        return fake.requested
+
+    def test_resume_skips_games_staged_by_the_interrupted_run(self):
+        appids = list(range(10, 16))
+
+        self.assertEqual(self.crawl(appids), appids)
+        self.assertEqual(self.crawl(appids), [])
+        self.assertEqual(len(storage.load_achievement_stage(STEAM_USER_ID)), len(appids))
+
+    def test_resume_refetches_done_games_whose_stage_expired(self):
+        appids = list(range(10, 16))
+        self.crawl(appids)
+
+        # Interrupted before the join: half the staged counts outlive STAGE_MAX_AGE
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE achievement_stage SET dh_updated = '2000-01-01 00:00:00' WHERE steam_game_id < 13")
+            statuses = {row[0] for row in conn.execute("SELECT status FROM crawl_checkpoint WHERE job = 'achievements'")}
+        self.assertEqual(statuses, {DONE})
+
+        self.assertEqual(self.crawl(appids), [10, 11, 12])
+
+        df_achievements_raw = storage.load_achievement_stage(STEAM_USER_ID)
+        self.assertEqual(sorted(df_achievements_raw['steam_game_id']), appids)
+        self.assertTrue((df_achievements_raw['total_game_acheivements'] == 4).all())
+        self.assertTrue((df_achievements_raw['total_game_acheivements_unlocked'] == 2).all())
+
+    def test_only_counted_or_statless_games_are_settled(self):
+        df_achievements_raw = pd.DataFrame({'steam_game_id': [10, 11]})
+
+        self.assertEqual(_settled_appids([10, 11, 12, 13], df_achievements_raw, [13]), [10, 11, 13])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities import raw_schema, storage
+from utilities.transform import build_game_frame, build_achievement_counts
+
+#---------------------- INCREMENTAL WATERMARKS ----------------------#
+#
+#   python -m unittest discover tests
+
+STEAM_USER_ID = '76561190000000001'
+
+# GetOwnedGames leaves rtime_last_played out for some entries
+GAMES = [
+    {'appid': 10, 'name': 'Game 10', 'playtime_forever': 50, 'rtime_last_played': 1700000000},
+    {'appid': 11, 'name': 'Game 11', 'playtime_forever': 30},
+]
+
+PAYLOADS = [
+    {'appid': appid, 'gameName': f'Game {appid}', 'achievements': [{'apiname': 'ACH', 'achieved': 1, 'unlocktime': 0}]}
+    for appid in (10, 11)
+]
+
+
+class GameWatermarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(raw_schema, 'RAW_DB_PATH', os.path.join(self.tmp.name, 'raw.db'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_games_without_last_played_time_get_a_watermark(self):
+        df_games, _ = build_game_frame(GAMES, STEAM_USER_ID)
+        self.assertEqual(df_games['rtime_last_played'].tolist(), [1700000000, 0])
+
+        storage.update_game_watermarks(STEAM_USER_ID, df_games, build_achievement_counts(PAYLOADS, STEAM_USER_ID), [10, 11])
+
+        appids_to_fetch, df_reused = storage.split_games_by_watermark(STEAM_USER_ID, df_games)
+        self.assertEqual(appids_to_fetch, [])
+        self.assertEqual(sorted(df_reused['steam_game_id']), [10, 11])
+
+
+if __name__ == '__main__':
+    unittest.main()
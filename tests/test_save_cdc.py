@@ -0,0 +1,122 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities import raw_schema, storage
+
+#---------------------- CHANGE DATA CAPTURE ----------------------#
+#
+#   python -m unittest discover tests
+
+USER = '76561190000000001'
+OTHER_USER = '76561190000000002'
+
+
+def games_snapshot(dh_updated, games, steam_user_id=USER):
+    """
+    collection_game_data rows of one user: games is a list of (appid, playtime_forever).
+    """
+
+    return pd.DataFrame({
+        'steam_user_id_x': steam_user_id,
+        'steam_game_id': [appid for appid, _ in games],
+        'name': [f'Game {appid}' for appid, _ in games],
+        'last_played_timestamp': datetime(2026, 1, 1),
+        'playtime_forever': [playtime for _, playtime in games],
+        'img_game_cover_url': 'icon',
+        'playtime_2weeks': 0.0,
+        'dh_updated': dh_updated,
+        'total_game_acheivements': 10,
+        'total_game_acheivements_unlocked': 5,
+    })
+
+
+class SaveCdcTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'raw.db')
+        patcher = mock.patch.object(raw_schema, 'RAW_DB_PATH', self.db_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def save(self, df, table_name='collection_game_data'):
+        with mock.patch('builtins.print'):
+            storage.save_to_sqlite(df, table_name=table_name, method='cdc')
+
+    def versions(self, steam_user_id=USER):
+        """
+        steam_game_id -> list of (playtime_forever, valid_from, valid_to), oldest first.
+        """
+
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                """
+                SELECT steam_game_id, playtime_forever, valid_from, valid_to FROM collection_game_data
+                WHERE steam_user_id_x = ? ORDER BY rowid
+                """,
+                (steam_user_id,)
+            ).fetchall()
+
+        versions = {}
+        for appid, playtime, valid_from, valid_to in rows:
+            versions.setdefault(appid, []).append((playtime, valid_from, valid_to))
+        return versions
+
+    def test_insert_unchanged_changed_and_absent_keys(self):
+        first, second = datetime(2026, 1, 1, 12), datetime(2026, 1, 2, 12)
+
+        self.save(games_snapshot(first, [(10, 60), (11, 30), (12, 90)]))
+        versions = self.versions()
+        self.assertEqual(sorted(versions), [10, 11, 12])
+        self.assertTrue(all(valid_to is None for rows in versions.values() for _, _, valid_to in rows))
+
+        # 10 unchanged, 11 played more, 12 gone, 13 new
+        self.save(games_snapshot(second, [(10, 60), (11, 45), (13, 15)]))
+        versions = self.versions()
+
+        self.assertEqual(len(versions[10]), 1)
+        self.assertIsNone(versions[10][0][2])
+
+        self.assertEqual([(playtime, valid_to is None) for playtime, _, valid_to in versions[11]], [(30, False), (45, True)])
+        self.assertEqual(versions[11][0][2], versions[11][1][1])
+
+        self.assertEqual(len(versions[12]), 1)
+        self.assertEqual(versions[12][0][2], str(second))
+
+        self.assertEqual([(playtime, valid_to) for playtime, _, valid_to in versions[13]], [(15, None)])
+
+    def test_absent_keys_are_only_closed_for_owners_in_the_snapshot(self):
+        self.save(pd.concat([
+            games_snapshot(datetime(2026, 1, 1), [(10, 60)]),
+            games_snapshot(datetime(2026, 1, 1), [(10, 60), (20, 5)], steam_user_id=OTHER_USER),
+        ]))
+
+        self.save(games_snapshot(datetime(2026, 1, 2), [(11, 5)]))
+
+        self.assertIsNotNone(self.versions()[10][0][2])
+        self.assertTrue(all(rows[-1][2] is None for rows in self.versions(OTHER_USER).values()))
+
+    def test_profiles_absent_from_a_batch_stay_current(self):
+        def profiles(dh_updated, steamids):
+            return pd.DataFrame({'steamid': steamids, 'personaname': 'player', 'dh_updated': dh_updated})
+
+        self.save(profiles(datetime(2026, 1, 1), [USER, OTHER_USER]), 'profile_data')
+        self.save(profiles(datetime(2026, 1, 2), [USER]), 'profile_data')
+
+        with sqlite3.connect(self.db_path) as conn:
+            current = {row[0] for row in conn.execute("SELECT steamid FROM profile_data WHERE valid_to IS NULL")}
+        self.assertEqual(current, {USER, OTHER_USER})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import hashlib
+import pandas as pd
+
+from utilities.steam_api import get_owned_games, get_game_achievements, get_game_schemas
+from utilities.storage import load_user_games, load_player_achievements
+from utilities.transform import describe_achievements
+from utilities.cache import connect_cache, get_cached_completion, store_completion
+
+
+#---------------------------------- AI achievement tips ----------------------------------#
+#
+# The OpenAI SDK and questionary are only needed by this interactive feature:
+# they are imported on first use so headless runs never load them.
+#
+# Completions are cached per (appid, locked achievements, model, prompt
+# version): asking again for the same game returns instantly and costs no
+# tokens until the player unlocks something. Set OPENAI_BASE_URL to a local
+# stub (benchmarks/mock_steam.py answers /v1/chat/completions) to try it offline.
+
+# Bump when the prompt changes, so cached answers to the old prompt are not reused
+PROMPT_VERSION = 1
+
+
+def completion_cache_key(appid, achievements, model):
+    """
+    Build the cache key of the tips for a game: appid, hash of the locked apinames, model and prompt version.
+    """
+
+    locked = sorted(achievement['apiname'] for achievement in achievements if not achievement['achieved'])
+    locked_hash = hashlib.sha256('\n'.join(locked).encode('utf-8')).hexdigest()[:16]
+
+    return f'{appid}:{locked_hash}:{model}:v{PROMPT_VERSION}'
+
+
+def get_achievement_tips(ai_api_key, appid, game_name, achievements, model=None, use_cache=True):
+    """
+    Ask the OpenAI chat completions API for tips on the locked achievements of a game.
+
+    Parameters:
+    - ai_api_key (str): The OpenAI API key.
+    - appid (int): The application ID of the game.
+    - game_name (str): The name of the game, used in the prompt.
+    - achievements (list): Output of describe_achievements for the player and game.
+    - model (str): The chat model. Defaults to $GPT_MODEL.
+    - use_cache (bool): Reuse a cached answer for the same locked set, model and prompt version.
+
+    Returns:
+    - content (str): The tips, as written by the model.
+    """
+
+    model = model or os.getenv("GPT_MODEL")
+    cache_key = completion_cache_key(appid, achievements, model)
+
+    if use_cache:
+        conn = connect_cache()
+        content = get_cached_completion(conn, cache_key)
+        conn.close()
+
+        if content is not None:
+            print('(cached answer)')
+            return content
+
+    # Only a cache miss pays for the SDK import, and only then requires openai to be installed
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key = ai_api_key
+    )
+
+    prompt = f"""
+    You are a famous and respected video game journalist who specializes in helping players achieve 100% completion, platinum trophies, or 1000G achievements.
+
+    I will provide you with:
+
+    - The name of a game
+    - A JSON file containing all achievements in this game, indicating which ones the player has unlocked and which ones remain locked.
+
+    unlocked achievements is set to true, and locked achievements is set to false.
+
+    For each locked achievement, please provide:
+
+    1. The achievement name.
+    2. A brief summary of what the player needs to do to unlock it.
+    3. Helpful tips to achieve it.
+
+    If an achievement has no description in the JSON, search for official information on the internet (e.g., game wikis, official sources).  
+    - If you find reliable info, include it as the summary and tips.  
+
+    for each achievement, please provide the information in the following format:
+    - Achievement Name: [Achievement Name]
+    - Summary: [Brief summary of what the player needs to do to unlock it]
+    - Tips: [Helpful tips to achieve it]
+
+    Please provide your response clearly and concisely, as if you are preparing a guide to be shown inside a gaming app.
+
+    Here is the game name and the JSON data:
+
+    Game: {game_name}
+
+    Achievements JSON:  
+    {achievements}
+    """
+
+    completion = client.chat.completions.create(
+        model=model,
+        store=True,
+        temperature=0.5,
+        max_tokens=800,
+        messages=[
+            {"role": "user", "content": prompt }
+        ]
+    )
+
+    content = completion.choices[0].message.content
+
+    if use_cache and content:
+        conn = connect_cache()
+        store_completion(conn, cache_key, content)
+        conn.close()
+
+    return content
+
+
+def ai_achievement_breakdown(ai_api_key, steam_user_id, API_KEY, game_df=None, use_cache=True):
+    """
+    Function to interact with OpenAI API to get achievement breakdown.
+
+    Parameters:
+    - ai_api_key (str): The OpenAI API key.
+    - steam_user_id (str): The Steam user ID.
+    - API_KEY (str): The API key for Steam API.
+    - game_df (pd.DataFrame): Games already extracted in this run (steam_game_id, name), so they are not fetched again.
+    - use_cache (bool): Reuse cached answers, see get_achievement_tips.
+    """
+
+    import questionary
+
+    if game_df is None:
+        game_df = load_user_games(steam_user_id)
+
+    if game_df is None:
+        games_info = get_owned_games(steam_user_id, API_KEY).get('response').get('games')
+
+        game_list = []
+
+        for game in games_info:
+            game_list.append(
+                {
+                    "name": game['name'],
+                    "steam_game_id": game['appid']
+                }
+            )
+
+        game_df = pd.DataFrame(game_list)
+
+    game_df = game_df.sort_values(by='name')
+
+    options = game_df['name'].to_list()
+
+    selected_option = questionary.select(
+        "Select a game to view unlocked achievements breakdonw:",
+        choices=options
+    ).ask()
+
+    appid = game_df[game_df['name'] == selected_option]['steam_game_id'].iloc[0]
+
+    print(f"You selected: {selected_option}({appid})")
+
+    achievements = load_player_achievements(steam_user_id, appid)
+
+    if achievements is None:
+        json_game_breakdown = get_game_achievements(steam_user_id, API_KEY, appid)
+        achievements = json_game_breakdown.get('playerstats').get('achievements')
+
+    # Names and descriptions come from the shared schema cache, not from the player's payload
+    schema = get_game_schemas(API_KEY, [appid]).get(str(appid))
+    achievements = describe_achievements(achievements or [], schema)
+
+    print(get_achievement_tips(ai_api_key, appid, selected_option, achievements, use_cache=use_cache))
@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import requests
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+
+from utilities.http_client import get_session, get_limiter, _backoff_delay, RETRY_STATUS
+from utilities.raw_schema import connect_raw, ensure_raw_table
+from utilities.metrics import record_request, record_retry
+
+
+#---------------------------------- Image asset store ----------------------------------#
+#
+# Avatars, game icons and store headers are downloaded once into a
+# content-addressed directory, for reports and exports:
+#
+#   <ASSET_DIR>/avatars/ab/abcdef....jpg    key: avatarhash
+#   <ASSET_DIR>/icons/12/12ab34....jpg      key: img_icon_url (the icon hash)
+#   <ASSET_DIR>/headers/9f/9f86d0....jpg    key: sha1 of header_image (its ?t= changes with the image)
+#
+# Steam already names avatars and icons by a hash of their content, so users
+# sharing a game share its icon file, and a key present on disk is never
+# requested again. Images are streamed to a temporary file and renamed into
+# place, so a partial download is never mistaken for a stored asset.
+
+ASSET_DIR = os.getenv('STEAM_ASSET_DIR', 'database/assets')
+
+# Host of the community images (game icons)
+STEAM_MEDIA_BASE = os.getenv('STEAM_MEDIA_BASE', 'https://media.steampowered.com').rstrip('/')
+
+CHUNK_SIZE = 64 * 1024
+
+DOWNLOADED = 'downloaded'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+_HASH = re.compile(r'^[0-9a-f]{40}$')
+
+
+def asset_key(value):
+    """
+    Use a Steam content hash as key when it is one, the sha1 of the value otherwise (URLs, unexpected formats).
+    """
+
+    normalized = str(value).strip().lower()
+
+    return normalized if _HASH.match(normalized) else hashlib.sha1(str(value).encode('utf-8')).hexdigest()
+
+
+def asset_path(kind, key, asset_dir=None):
+    """
+    Path of an asset in the store.
+
+    Parameters:
+    - kind (str): 'avatars', 'icons' or 'headers'.
+    - key (str): The asset key, see asset_key.
+    - asset_dir (str): Root of the store. Defaults to ASSET_DIR.
+
+    Returns:
+    - path (str): <asset_dir>/<kind>/<key[:2]>/<key>.jpg, whether it exists or not.
+    """
+
+    key = asset_key(key)
+
+    return os.path.join(asset_dir or ASSET_DIR, kind, key[:2], f'{key}.jpg')
+
+
+def icon_url(appid, icon_hash):
+    return f'{STEAM_MEDIA_BASE}/steamcommunity/public/images/apps/{appid}/{icon_hash}.jpg'
+
+
+def collect_assets(df_profiles=None, df_games=None, df_metadata=None, asset_dir=None):
+    """
+    List the assets referenced by extracted frames, once per key.
+
+    Parameters:
+    - df_profiles (pd.DataFrame): profile_data rows (avatarhash, avatarmedium).
+    - df_games (pd.DataFrame): collection_game_data rows (steam_game_id, img_game_cover_url).
+    - df_metadata (pd.DataFrame): game_metadata rows (header_image).
+    - asset_dir (str): Root of the store. Defaults to ASSET_DIR.
+
+    Returns:
+    - assets (dict): store path -> source URL.
+    """
+
+    assets = {}
+
+    if df_profiles is not None and not df_profiles.empty:
+        for avatar_hash, url in zip(df_profiles['avatarhash'], df_profiles['avatarmedium']):
+            if avatar_hash and url:
+                assets.setdefault(asset_path('avatars', avatar_hash, asset_dir), url)
+
+    if df_games is not None and not df_games.empty:
+        for appid, icon_hash in zip(df_games['steam_game_id'], df_games['img_game_cover_url']):
+            if icon_hash:
+                assets.setdefault(asset_path('icons', icon_hash, asset_dir), icon_url(appid, icon_hash))
+
+    if df_metadata is not None and not df_metadata.empty:
+        for url in df_metadata['header_image']:
+            if url:
+                assets.setdefault(asset_path('headers', url, asset_dir), url)
+
+    return assets
+
+
+def collect_stored_assets(conn=None, asset_dir=None):
+    """
+    List the assets referenced by the current rows of the raw database, once per key.
+
+    Returns:
+    - assets (dict): store path -> source URL.
+    """
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_raw()
+
+    for table_name in ('profile_data', 'collection_game_data', 'game_metadata'):
+        ensure_raw_table(conn, table_name)
+
+    assets = collect_assets(
+        pd.read_sql_query("SELECT DISTINCT avatarhash, avatarmedium FROM profile_data WHERE valid_to IS NULL", conn),
+        pd.read_sql_query("SELECT DISTINCT steam_game_id, img_game_cover_url FROM collection_game_data WHERE valid_to IS NULL", conn),
+        pd.read_sql_query("SELECT DISTINCT header_image FROM game_metadata WHERE valid_to IS NULL", conn),
+        asset_dir
+    )
+
+    if own_conn:
+        conn.close()
+
+    return assets
+
+
+def download_asset(url, path, retry=3, wait=2):
+    """
+    Stream one image to its store path, unless it is already there.
+
+    Throttled by the token bucket of the image host (see http_client.limiter_key) and retried like make_request.
+
+    Returns:
+    - status (str): DOWNLOADED, SKIPPED or FAILED.
+    """
+
+    if os.path.exists(path):
+        return SKIPPED
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    session = get_session()
+    limiter = get_limiter(url)
+    # Unique per thread: two workers never share a temporary file
+    part_path = f'{path}.{os.getpid()}.{threading.get_ident()}.part'
+
+    for attempt in range(retry):
+        limiter.acquire()
+        started = time.perf_counter()
+        try:
+            with session.get(url, stream=True, timeout=30) as response:
+                if response.status_code == 200:
+                    nbytes = 0
+                    with open(part_path, 'wb') as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                            nbytes += len(chunk)
+
+                    os.replace(part_path, path)
+                    record_request(url, 200, time.perf_counter() - started, nbytes)
+                    return DOWNLOADED
+
+                record_request(url, response.status_code, time.perf_counter() - started)
+
+                if response.status_code not in RETRY_STATUS:
+                    return FAILED
+
+                delay = _backoff_delay(attempt, wait, response)
+                if response.status_code == 429:
+                    limiter.block(delay)
+                if attempt == retry - 1:
+                    break
+                record_retry(url, response.status_code)
+                if response.status_code != 429:
+                    time.sleep(delay)
+        except (requests.exceptions.RequestException, OSError) as e:
+            record_request(url, 'error', time.perf_counter() - started)
+            print(f'Error downloading {url}: {e}')
+            if attempt == retry - 1:
+                break
+            record_retry(url, 'error')
+            time.sleep(_backoff_delay(attempt, wait))
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    return FAILED
+
+
+def download_assets(assets, max_workers=8, show_progress=True):
+    """
+    Download the missing assets concurrently.
+
+    Parameters:
+    - assets (dict): store path -> source URL, as returned by collect_assets.
+    - max_workers (int): Maximum number of downloads in flight.
+    - show_progress (bool): Display a tqdm progress bar.
+
+    Returns:
+    - counts (dict): Number of assets downloaded, skipped (already stored) and failed.
+    """
+
+    counts = {DOWNLOADED: 0, SKIPPED: 0, FAILED: 0}
+
+    # Known keys are settled without a request, and without a thread
+    missing = {path: url for path, url in assets.items() if not os.path.exists(path)}
+    counts[SKIPPED] = len(assets) - len(missing)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(download_asset, url, path) for path, url in missing.items()]
+        results = as_completed(futures)
+
+        if show_progress:
+            results = tqdm(results, desc="Downloading images", total=len(futures), ncols=100)
+
+        for future in results:
+            counts[future.result()] += 1
+
+    return counts
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+
+
+#---------------------------------- Store metadata, schema and AI completion cache ----------------------------------#
+
+CACHE_DB_PATH = os.getenv('STEAM_CACHE_DB', 'database/steam_cache.db')
+
+# Time-to-live (seconds) for games found in the store, and for appids the store
+# answered with success: false. Both can be overridden through the environment.
+METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', 30 * 24 * 3600))
+METADATA_NEGATIVE_TTL = int(os.getenv('METADATA_NEGATIVE_TTL', 7 * 24 * 3600))
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv('METADATA_CACHE_MAX_ENTRIES', 50000))
+
+# Achievement schemas (names, descriptions, icons) are shared by every owner of
+# a game and rarely change.
+SCHEMA_CACHE_TTL = int(os.getenv('SCHEMA_CACHE_TTL', 30 * 24 * 3600))
+
+# AI achievement tips only change when the player unlocks something, the model or the prompt changes
+AI_COMPLETION_TTL = int(os.getenv('AI_COMPLETION_TTL', 7 * 24 * 3600))
+AI_COMPLETION_MAX_ENTRIES = int(os.getenv('AI_COMPLETION_MAX_ENTRIES', 5000))
+
+
+def connect_cache(db_path=None):
+    """
+    Open the cache database and make sure the cache tables exist.
+
+    Parameters:
+    - db_path (str): Path of the SQLite cache file. Defaults to CACHE_DB_PATH.
+
+    Returns:
+    - conn (sqlite3.Connection): The open connection.
+    """
+
+    conn = sqlite3.connect(db_path or CACHE_DB_PATH)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS appdetails_cache
+        (
+            appid TEXT PRIMARY KEY,
+            success INT,
+            payload BLOB,
+            fetched_at REAL,
+            last_access REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appdetails_cache_last_access ON appdetails_cache (last_access)")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS game_schema_cache
+        (
+            appid TEXT PRIMARY KEY,
+            success INT,
+            payload BLOB,
+            fetched_at REAL,
+            last_access REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_game_schema_cache_last_access ON game_schema_cache (last_access)")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_completion_cache
+        (
+            cache_key TEXT PRIMARY KEY,
+            payload BLOB,
+            fetched_at REAL,
+            last_access REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_completion_cache_last_access ON ai_completion_cache (last_access)")
+
+    return conn
+
+
+def get_cached_appdetails(conn, appids, ttl=METADATA_CACHE_TTL, negative_ttl=METADATA_NEGATIVE_TTL):
+    """
+    Look up fresh appdetails entries for a list of appids.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection returned by connect_cache.
+    - appids (list): The appids to look up.
+    - ttl (int): Max age in seconds of a positive entry.
+    - negative_ttl (int): Max age in seconds of a success: false entry.
+
+    Returns:
+    - cached (dict): appid -> store 'data' dict, or None for negative entries. Stale or missing appids are not included.
+    """
+
+    return _get_cached_entries(conn, 'appdetails_cache', appids, ttl, negative_ttl)
+
+
+def store_appdetails(conn, entries, max_entries=METADATA_CACHE_MAX_ENTRIES):
+    """
+    Write appdetails entries to the cache and evict the least recently used ones above the size cap.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection returned by connect_cache.
+    - entries (dict): appid -> store 'data' dict, or None when the store answered success: false.
+    - max_entries (int): Maximum number of entries kept in the cache.
+    """
+
+    _store_entries(conn, 'appdetails_cache', entries, max_entries)
+
+
+def get_cached_schemas(conn, appids, ttl=SCHEMA_CACHE_TTL):
+    """
+    Look up fresh achievement schemas for a list of appids.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection returned by connect_cache.
+    - appids (list): The appids to look up.
+    - ttl (int): Max age in seconds of an entry.
+
+    Returns:
+    - cached (dict): appid -> list of achievement definitions, or None for games without stats.
+    """
+
+    return _get_cached_entries(conn, 'game_schema_cache', appids, ttl, ttl)
+
+
+def store_schemas(conn, entries, max_entries=METADATA_CACHE_MAX_ENTRIES):
+    """
+    Write achievement schemas to the cache and evict the least recently used ones above the size cap.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection returned by connect_cache.
+    - entries (dict): appid -> list of achievement definitions, or None for games without stats.
+    - max_entries (int): Maximum number of entries kept in the cache.
+    """
+
+    _store_entries(conn, 'game_schema_cache', entries, max_entries)
+
+
+def get_cached_completion(conn, cache_key, ttl=AI_COMPLETION_TTL):
+    """
+    Look up a fresh AI completion.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection returned by connect_cache.
+    - cache_key (str): Key built by the caller from everything the completion depends on.
+    - ttl (int): Max age in seconds of an entry.
+
+    Returns:
+    - content (str): The cached completion text, or None if missing or stale.
+    """
+
+    row = conn.execute(
+        "SELECT payload, fetched_at FROM ai_completion_cache WHERE cache_key = ?",
+        (cache_key,)
+    ).fetchone()
+
+    if row is None or time.time() - row[1] > ttl:
+        return None
+
+    conn.execute("UPDATE ai_completion_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+    conn.commit()
+
+    return zlib.decompress(row[0]).decode('utf-8')
+
+
+def store_completion(conn, cache_key, content, max_entries=AI_COMPLETION_MAX_ENTRIES):
+    """
+    Write an AI completion to the cache and evict the least recently used ones above the size cap.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection returned by connect_cache.
+    - cache_key (str): Key built by the caller from everything the completion depends on.
+    - content (str): The completion text.
+    - max_entries (int): Maximum number of entries kept in the cache.
+    """
+
+    now = time.time()
+
+    conn.execute(
+        """
+        INSERT INTO ai_completion_cache (cache_key, payload, fetched_at, last_access)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(cache_key) DO UPDATE SET
+            payload = excluded.payload,
+            fetched_at = excluded.fetched_at,
+            last_access = excluded.last_access
+        """,
+        (cache_key, zlib.compress(content.encode('utf-8')), now, now)
+    )
+
+    conn.execute(
+        """
+        DELETE FROM ai_completion_cache WHERE cache_key IN (
+            SELECT cache_key FROM ai_completion_cache
+            ORDER BY last_access DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (max_entries,)
+    )
+    conn.commit()
+
+
+def _get_cached_entries(conn, table_name, appids, ttl, negative_ttl):
+    now = time.time()
+    cached = {}
+    appids = [str(appid) for appid in appids]
+
+    # Stay well below SQLite's bound-parameter limit
+    for i in range(0, len(appids), 500):
+        chunk = appids[i:i + 500]
+        rows = conn.execute(
+            f"SELECT appid, success, payload, fetched_at FROM {table_name} WHERE appid IN ({','.join('?' * len(chunk))})",
+            chunk
+        ).fetchall()
+
+        for appid, success, payload, fetched_at in rows:
+            max_age = ttl if success else negative_ttl
+            if now - fetched_at > max_age:
+                continue
+            cached[appid] = json.loads(zlib.decompress(payload)) if success else None
+
+    if cached:
+        conn.executemany(
+            f"UPDATE {table_name} SET last_access = ? WHERE appid = ?",
+            [(now, appid) for appid in cached]
+        )
+        conn.commit()
+
+    return cached
+
+
+def _store_entries(conn, table_name, entries, max_entries):
+    now = time.time()
+
+    conn.executemany(
+        f"""
+        INSERT INTO {table_name} (appid, success, payload, fetched_at, last_access)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(appid) DO UPDATE SET
+            success = excluded.success,
+            payload = excluded.payload,
+            fetched_at = excluded.fetched_at,
+            last_access = excluded.last_access
+        """,
+        [
+            (
+                str(appid),
+                0 if data is None else 1,
+                None if data is None else zlib.compress(json.dumps(data).encode('utf-8')),
+                now,
+                now
+            )
+            for appid, data in entries.items()
+        ]
+    )
+
+    conn.execute(
+        f"""
+        DELETE FROM {table_name} WHERE appid IN (
+            SELECT appid FROM {table_name}
+            ORDER BY last_access DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (max_entries,)
+    )
+    conn.commit()
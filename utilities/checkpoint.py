@@ -0,0 +1,126 @@
+import os
+
+
+#---------------------------------- Crawl checkpoints ----------------------------------#
+#
+# Persisted work queue of the long crawls (achievements per user, store
+# metadata). Every appid gets a status as soon as its request finishes, so a
+# restarted run skips what is settled and only retries the failures, up to
+# CHECKPOINT_MAX_RETRIES attempts. A crawl clears its checkpoints once it
+# completes, so the retry count never outlives the interrupted crawl.
+
+CHECKPOINT_MAX_RETRIES = int(os.getenv('CHECKPOINT_MAX_RETRIES', 3))
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+NO_STATS = 'no-stats'
+
+
+def _ensure_checkpoint_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_checkpoint
+        (
+            job TEXT,
+            steam_user_id TEXT,
+            appid INTEGER,
+            status TEXT,
+            retries INTEGER DEFAULT 0,
+            dh_updated TIMESTAMP,
+            PRIMARY KEY (job, steam_user_id, appid)
+        )
+    """)
+
+
+def start_checkpoint(conn, job, steam_user_id, appid_list):
+    """
+    Register the appids of a crawl and get the ones still to request.
+
+    Appids already done or without stats are skipped, as are failures that
+    reached CHECKPOINT_MAX_RETRIES.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database.
+    - job (str): Name of the crawl ('achievements', 'metadata').
+    - steam_user_id (str): Owner of the crawl, '' when it is shared by every user.
+    - appid_list (list): The appids of the crawl.
+
+    Returns:
+    - pending (list): The appids to request, in the order of appid_list.
+    - settled (dict): appid -> status of the appids skipped.
+    """
+
+    _ensure_checkpoint_table(conn)
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO crawl_checkpoint (job, steam_user_id, appid, status, retries, dh_updated)
+            VALUES (?, ?, ?, ?, 0, datetime('now', 'localtime'))
+            """,
+            [(job, str(steam_user_id), int(appid), PENDING) for appid in appid_list]
+        )
+
+    settled = {
+        appid: status
+        for appid, status, retries in conn.execute(
+            "SELECT appid, status, retries FROM crawl_checkpoint WHERE job = ? AND steam_user_id = ?",
+            (job, str(steam_user_id))
+        )
+        if status in (DONE, NO_STATS) or (status == FAILED and retries >= CHECKPOINT_MAX_RETRIES)
+    }
+
+    pending = [appid for appid in appid_list if int(appid) not in settled]
+
+    return pending, settled
+
+
+def mark_checkpoint(conn, job, steam_user_id, statuses):
+    """
+    Record the outcome of finished requests. Failures increment the retry count.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database.
+    - job (str): Name of the crawl.
+    - steam_user_id (str): Owner of the crawl, '' when it is shared by every user.
+    - statuses (list): (appid, status) tuples.
+    """
+
+    _ensure_checkpoint_table(conn)
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO crawl_checkpoint (job, steam_user_id, appid, status, retries, dh_updated)
+            VALUES (?, ?, ?, ?, ?, datetime('now', 'localtime'))
+            ON CONFLICT(job, steam_user_id, appid) DO UPDATE SET
+                status = excluded.status,
+                retries = retries + excluded.retries,
+                dh_updated = excluded.dh_updated
+            """,
+            [(job, str(steam_user_id), int(appid), status, int(status == FAILED)) for appid, status in statuses]
+        )
+
+
+def clear_checkpoint(conn, job, steam_user_id, statuses=None):
+    """
+    Forget the checkpoints of a finished crawl.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database.
+    - job (str): Name of the crawl.
+    - steam_user_id (str): Owner of the crawl, '' when it is shared by every user.
+    - statuses (tuple): Only clear these statuses. Defaults to every status.
+    """
+
+    _ensure_checkpoint_table(conn)
+
+    query = "DELETE FROM crawl_checkpoint WHERE job = ? AND steam_user_id = ?"
+    params = [job, str(steam_user_id)]
+
+    if statuses:
+        query += f" AND status IN ({', '.join('?' * len(statuses))})"
+        params.extend(statuses)
+
+    with conn:
+        conn.execute(query, params)
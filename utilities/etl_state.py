@@ -0,0 +1,99 @@
+from utilities.raw_schema import get_table_generation
+
+
+#---------------------------------- ETL high-watermarks ----------------------------------#
+#
+# The raw tables are append-only, so every ETL job remembers the last raw rowid
+# it merged and only reads rows appended after it on the next run. The
+# watermarks live in the target (trusted) database, next to the data they
+# describe, so both commit in the same transaction.
+#
+# A raw table saved with method='replace' restarts its rowids, so every
+# watermark also remembers the generation of its source table (see
+# raw_schema.bump_table_generation) and starts over when it changed.
+
+
+def _ensure_watermark_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_watermark
+        (
+            job_name TEXT PRIMARY KEY,
+            last_rowid INTEGER,
+            dh_updated DATETIME
+        )
+    """)
+
+    # Watermarks stored before table generations existed were taken on generation 0
+    columns = {row[1] for row in cursor.execute("PRAGMA main.table_info(etl_watermark)")}
+    if 'source_generation' not in columns:
+        cursor.execute("ALTER TABLE main.etl_watermark ADD COLUMN source_generation INTEGER NOT NULL DEFAULT 0")
+
+
+def get_rowid_range(cursor, job_name, source_table):
+    """
+    Get the rowid range of raw rows not yet processed by a job.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor on the database holding the watermarks.
+    - job_name (str): Unique name of the ETL step.
+    - source_table (str): Raw table to read, schema-qualified if attached (e.g. 'raw.profile_data').
+
+    Returns:
+    - (low, high) (tuple): Process rows with low < rowid <= high. low is 0 when the job must start over.
+    """
+
+    _ensure_watermark_table(cursor)
+
+    schema, _, table_name = source_table.rpartition('.')
+    generation = get_table_generation(cursor, table_name, schema or 'main')
+
+    row = cursor.execute("SELECT last_rowid, source_generation FROM etl_watermark WHERE job_name = ?", (job_name,)).fetchone()
+    low = row[0] if row else 0
+
+    high = cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {source_table}").fetchone()[0]
+
+    # The raw table was rebuilt (e.g. saved with method='replace'): start over
+    if row and row[1] != generation:
+        print(f'Raw table {source_table} was replaced since the last run of {job_name}, reprocessing it entirely.')
+        low = 0
+    elif high < low:
+        print(f'Raw table {source_table} shrank below the watermark of {job_name}, reprocessing it entirely.')
+        low = 0
+
+    # Remember the generation now: if the job fails, its next run still starts over from low
+    cursor.execute(
+        """
+        INSERT INTO etl_watermark (job_name, last_rowid, source_generation, dh_updated)
+        VALUES (?, ?, ?, datetime('now', 'localtime'))
+        ON CONFLICT(job_name) DO UPDATE SET
+            last_rowid = excluded.last_rowid,
+            source_generation = excluded.source_generation
+        """,
+        (job_name, low, generation)
+    )
+
+    return low, high
+
+
+def set_watermark(cursor, job_name, last_rowid):
+    """
+    Store the last raw rowid processed by a job. Commit together with the merged data.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor on the database holding the watermarks.
+    - job_name (str): Unique name of the ETL step.
+    - last_rowid (int): Highest raw rowid merged by this run.
+    """
+
+    _ensure_watermark_table(cursor)
+
+    cursor.execute(
+        """
+        INSERT INTO etl_watermark (job_name, last_rowid, dh_updated)
+        VALUES (?, ?, datetime('now', 'localtime'))
+        ON CONFLICT(job_name) DO UPDATE SET
+            last_rowid = excluded.last_rowid,
+            dh_updated = excluded.dh_updated
+        """,
+        (job_name, last_rowid)
+    )
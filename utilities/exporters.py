@@ -0,0 +1,186 @@
+import os
+import pandas as pd
+from datetime import datetime
+
+
+#---------------------------------- File exporters ----------------------------------#
+#
+# pyarrow (Parquet) and tkinter (directory picker) are optional: they are only
+# imported by the functions that need them.
+
+def save_file(df_final, file_name, file_format, file_path=None):
+    """
+    Write a DataFrame to disk without any user interaction.
+    
+    Parameters:
+    - df_final (pd.DataFrame): The DataFrame to save.
+    - file_name (str): File name without extension.
+    - file_format (str): 'csv', 'excel', 'json' or 'parquet'.
+    - file_path (str): Target directory. Defaults to the current directory.
+    
+    Returns:
+    - full_path (str): The path of the written file (the dataset directory for parquet).
+    """
+
+    base_name = f"{file_path}/{file_name}" if file_path else file_name
+
+    if file_format == 'csv':
+        full_path = f"{base_name}.csv"
+        df_final.to_csv(full_path, index=False)
+    elif file_format == 'excel':
+        full_path = f"{base_name}.xlsx"
+        df_final.to_excel(full_path, index=False)
+    elif file_format == 'json':
+        full_path = f"{base_name}.json"
+        df_final.to_json(full_path, orient='records', lines=True)
+    elif file_format == 'parquet':
+        full_path = export_parquet(df_final, base_name)
+    else:
+        raise ValueError(f'Unknown file format: {file_format}')
+
+    return full_path
+
+#----------------------------------------------------------------------
+
+# Partition columns of the Parquet datasets: the owner of the rows, when the
+# table has one, then the snapshot date derived from dh_updated.
+PARQUET_USER_COLUMNS = ('steam_user_id_x', 'steam_user_id', 'steamid')
+PARQUET_COMPRESSION = os.getenv('PARQUET_COMPRESSION', 'zstd')
+
+
+def export_parquet(df_final, dataset_path, compression=PARQUET_COMPRESSION):
+    """
+    Append a DataFrame to a Parquet dataset partitioned by steam user and snapshot date.
+
+    String columns are dictionary encoded. Every call writes new files, so
+    successive snapshots accumulate in their own snapshot_date partitions.
+    Read it back with pd.read_parquet(dataset_path), optionally with filters.
+
+    Parameters:
+    - df_final (pd.DataFrame): The DataFrame to save.
+    - dataset_path (str): Root directory of the dataset.
+    - compression (str): Parquet codec ('zstd', 'snappy', 'gzip' or 'none').
+
+    Returns:
+    - dataset_path (str): The root directory of the dataset.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from e
+
+    df_export = df_final.copy()
+
+    partition_cols = [column for column in PARQUET_USER_COLUMNS if column in df_export.columns][:1]
+
+    if 'dh_updated' in df_export.columns:
+        df_export['snapshot_date'] = pd.to_datetime(df_export['dh_updated']).dt.strftime('%Y-%m-%d')
+    else:
+        df_export['snapshot_date'] = datetime.now().strftime('%Y-%m-%d')
+
+    partition_cols.append('snapshot_date')
+
+    for column in partition_cols:
+        df_export[column] = df_export[column].astype(str)
+
+    table = pa.Table.from_pandas(df_export, preserve_index=False)
+
+    string_columns = [
+        field.name for field in table.schema
+        if field.name not in partition_cols and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type) or pa.types.is_dictionary(field.type))
+    ]
+
+    pq.write_to_dataset(
+        table,
+        root_path=dataset_path,
+        partition_cols=partition_cols,
+        compression=compression,
+        use_dictionary=string_columns,
+        basename_template=f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+    return dataset_path
+
+
+def load_parquet_dataset(dataset_path, steam_user_ids=None, start_date=None, end_date=None):
+    """
+    Read a dataset written by export_parquet, pruning partitions by user and snapshot date.
+
+    Parameters:
+    - dataset_path (str): Root directory of the dataset.
+    - steam_user_ids (list): Only read these users. Defaults to every user.
+    - start_date (str): First snapshot date to read, as 'YYYY-MM-DD'.
+    - end_date (str): Last snapshot date to read, as 'YYYY-MM-DD'.
+
+    Returns:
+    - df (pd.DataFrame): The matching rows, partition columns included.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from e
+
+    # Partition values are strings: Steam IDs must not be inferred as integers
+    partition_fields = []
+    for entry in os.scandir(dataset_path):
+        if entry.is_dir() and '=' in entry.name:
+            partition_fields.append(entry.name.split('=', 1)[0])
+            if partition_fields[0] != 'snapshot_date':
+                partition_fields.append('snapshot_date')
+            break
+
+    if not partition_fields:
+        return pd.DataFrame()
+
+    partitioning = ds.partitioning(pa.schema([(field, pa.string()) for field in partition_fields]), flavor='hive')
+    dataset = ds.dataset(dataset_path, format='parquet', partitioning=partitioning)
+
+    conditions = []
+    if steam_user_ids is not None and partition_fields[0] != 'snapshot_date':
+        conditions.append(ds.field(partition_fields[0]).isin([str(steam_user_id) for steam_user_id in steam_user_ids]))
+    if start_date:
+        conditions.append(ds.field('snapshot_date') >= start_date)
+    if end_date:
+        conditions.append(ds.field('snapshot_date') <= end_date)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    return dataset.to_table(filter=expression).to_pandas()
+
+#----------------------------------------------------------------------
+
+def save_file_opt(df_final, file_name):
+
+    # tkinter is only needed for the interactive directory picker
+    import tkinter as tk
+    from tkinter import filedialog
+
+    while True:
+        option = int(input("Select an option:\n1. Save as CSV\n2. Save as Excel\n3. Save as JSON\n4. Save as Parquet dataset\n"))
+        if option in [1, 2, 3, 4]:
+            break
+        else:
+            print("Invalid option. Please select 1, 2, 3, or 4.")
+
+    cust_path = input("Do you want to save the file in a custom path? (yes/no): ").lower()
+
+    root = tk.Tk()
+
+    file_path = None
+
+    if cust_path == 'yes':
+        file_path = filedialog.askdirectory(title="Select a directory")
+        print(f"Selected directory: {file_path}")
+    else:
+        print("Using current directory for saving files.")
+
+    file_format = {1: 'csv', 2: 'excel', 3: 'json', 4: 'parquet'}[option]
+
+    save_file(df_final, file_name, file_format, file_path)
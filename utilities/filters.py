@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import pandas as pd
+
+
+#---------------------------------- Game filters ----------------------------------#
+#
+# Answers questions like "RPGs with less than 50% of the achievements unlocked
+# and more than 10 hours played" over the trusted database, for every user at
+# once. Genres, categories and developers are matched through the bridge tables
+# built by etl_db_trusted.py, so no JSON is parsed at query time:
+#
+#   filter_games(genres=['RPG'], max_completion=0.5, min_hours=10)
+#
+# Criteria of different kinds are combined with AND, several values of the same
+# kind with OR. Names are matched case-insensitively.
+
+TRUSTED_DB_PATH = os.getenv('STEAM_TRUSTED_DB', 'database/steam_data_trusted.db')
+
+# Bridge table, column matched by the filter
+BRIDGES = {
+    'genres': ('game_genre', 'genre'),
+    'categories': ('game_category', 'category'),
+    'developers': ('game_developer', 'developer'),
+}
+
+
+def filter_games(
+    steam_user_ids=None,
+    genres=None,
+    categories=None,
+    developers=None,
+    min_hours=None,
+    max_hours=None,
+    min_completion=None,
+    max_completion=None,
+    conn=None
+):
+    """
+    Select the games of collection_game_data matching every given criterion.
+
+    Parameters:
+    - steam_user_ids (list): Restrict to these users. Defaults to every user.
+    - genres (list): Store genres (e.g. ['RPG', 'Strategy']), any of them.
+    - categories (list): Store categories (e.g. ['Single-player']), any of them.
+    - developers (list): Developers, any of them.
+    - min_hours (float): Minimum total playtime in hours.
+    - max_hours (float): Maximum total playtime in hours.
+    - min_completion (float): Minimum share of achievements unlocked, from 0 to 1.
+    - max_completion (float): Maximum share of achievements unlocked, from 0 to 1. Games without achievements never match a completion filter.
+    - conn (sqlite3.Connection): Connection to the trusted database. Defaults to TRUSTED_DB_PATH.
+
+    Returns:
+    - df_games (pd.DataFrame): The matching collection_game_data rows with their completion share, best completed first.
+    """
+
+    conditions = []
+    params = []
+
+    for criterion, values in (('genres', genres), ('categories', categories), ('developers', developers)):
+        if values:
+            table_name, column = BRIDGES[criterion]
+            conditions.append(
+                f"c.steam_game_id IN (SELECT steam_game_id FROM {table_name} WHERE {column} IN ({','.join('?' * len(values))}))"
+            )
+            params.extend(values)
+
+    if steam_user_ids:
+        conditions.append(f"c.steam_user_id IN ({','.join('?' * len(steam_user_ids))})")
+        params.extend(str(steam_user_id) for steam_user_id in steam_user_ids)
+
+    # playtime_forever is stored in minutes
+    if min_hours is not None:
+        conditions.append("c.playtime_forever >= ?")
+        params.append(min_hours * 60)
+
+    if max_hours is not None:
+        conditions.append("c.playtime_forever <= ?")
+        params.append(max_hours * 60)
+
+    if min_completion is not None or max_completion is not None:
+        conditions.append("c.total_game_acheivements > 0")
+
+    if min_completion is not None:
+        conditions.append("c.total_game_acheivements_unlocked >= ? * c.total_game_acheivements")
+        params.append(min_completion)
+
+    if max_completion is not None:
+        conditions.append("c.total_game_acheivements_unlocked <= ? * c.total_game_acheivements")
+        params.append(max_completion)
+
+    query = f"""
+        SELECT
+            c.steam_user_id,
+            c.steam_game_id,
+            c.name,
+            c.playtime_forever,
+            ROUND(c.playtime_forever / 60.0, 1) AS playtime_hours,
+            c.total_game_acheivements,
+            c.total_game_acheivements_unlocked,
+            CAST(c.total_game_acheivements_unlocked AS REAL) / NULLIF(c.total_game_acheivements, 0) AS completion,
+            c.last_played_timestamp
+        FROM collection_game_data c
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY completion DESC, c.playtime_forever DESC
+    """
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(TRUSTED_DB_PATH)
+
+    try:
+        df_games = pd.read_sql_query(query, conn, params=params)
+    finally:
+        if own_conn:
+            conn.close()
+
+    return df_games
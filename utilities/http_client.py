@@ -0,0 +1,220 @@
+import requests
+import os
+import time
+import random
+import threading
+import multiprocessing
+from urllib.parse import urlparse
+
+from utilities.metrics import record_request, record_retry
+
+
+#---------------------------------- HTTP client ----------------------------------#
+
+# Base URLs of the Web API and the store. Point them to a local stand-in
+# (see benchmarks/mock_steam.py) to run the extractor offline.
+STEAM_API_BASE = os.getenv('STEAM_API_BASE', 'https://api.steampowered.com').rstrip('/')
+STEAM_STORE_BASE = os.getenv('STEAM_STORE_BASE', 'https://store.steampowered.com').rstrip('/')
+
+# Requests per second and burst size allowed for each Steam endpoint, keyed by
+# URL prefix. The store endpoint is much stricter than the Web API, so it gets
+# its own bucket, even when both bases point at the same local stand-in.
+# Other URLs (e.g. images) get a bucket per host with DEFAULT_RATE_LIMIT.
+HOST_RATE_LIMITS = {
+    f'{STEAM_STORE_BASE}/api/': (float(os.getenv('STEAM_STORE_RATE', 0.6)), 5),
+    f'{STEAM_API_BASE}/': (float(os.getenv('STEAM_API_RATE', 10)), 20),
+}
+DEFAULT_RATE_LIMIT = (10, 20)
+MAX_BACKOFF = 60
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+
+    def block(self, seconds):
+        """
+        Pause every caller of this bucket, used when the host answers 429.
+        """
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in shared memory, so worker processes draw from one budget.
+
+    time.monotonic() is system-wide on Linux, macOS and Windows, so every process sees the same clock.
+    """
+
+    def __init__(self, rate, capacity, context=multiprocessing):
+        # tokens, updated, blocked_until. The context must match the one of the worker processes
+        self.state = context.Array('d', [capacity, time.monotonic(), 0.0])
+        self.__setstate__({'rate': rate, 'capacity': capacity, 'state': self.state})
+
+    def __getstate__(self):
+        return {'rate': self.rate, 'capacity': self.capacity, 'state': self.state}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = self.state.get_lock()
+        # The lock is taken by acquire() / block() already: read and write the raw array under it
+        self.values = self.state.get_obj()
+
+    tokens = property(lambda self: self.values[0], lambda self, value: self.values.__setitem__(0, value))
+    updated = property(lambda self: self.values[1], lambda self, value: self.values.__setitem__(1, value))
+    blocked_until = property(lambda self: self.values[2], lambda self, value: self.values.__setitem__(2, value))
+
+
+_session = None
+_session_lock = threading.Lock()
+_limiters = {}
+
+
+def get_session():
+    """
+    Return the shared, connection-pooled requests session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def limiter_key(url):
+    """
+    Name of the bucket a URL draws from: the longest matching prefix of HOST_RATE_LIMITS, its host:port otherwise.
+    """
+    prefixes = [prefix for prefix in HOST_RATE_LIMITS if url.startswith(prefix)]
+
+    return max(prefixes, key=len) if prefixes else urlparse(url).netloc
+
+
+def get_limiter(url):
+    """
+    Return the token bucket shared by every request to the endpoint of the given URL (see limiter_key).
+    """
+    key = limiter_key(url)
+    with _session_lock:
+        if key not in _limiters:
+            rate, capacity = HOST_RATE_LIMITS.get(key, DEFAULT_RATE_LIMIT)
+            _limiters[key] = TokenBucket(rate, capacity)
+        return _limiters[key]
+
+
+def create_shared_limiters(context=multiprocessing):
+    """
+    Build one SharedTokenBucket per configured endpoint, to be handed to worker processes at start-up.
+    """
+    return {prefix: SharedTokenBucket(rate, capacity, context) for prefix, (rate, capacity) in HOST_RATE_LIMITS.items()}
+
+
+def install_limiters(limiters):
+    """
+    Make this process throttle through the given buckets (e.g. the shared ones of a process pool).
+    """
+    with _session_lock:
+        _limiters.update(limiters)
+
+
+def _backoff_delay(attempt, wait, response=None):
+    """
+    Exponential backoff with jitter, honouring the Retry-After header when present.
+    """
+    delay = min(MAX_BACKOFF, wait * 2 ** attempt) + random.uniform(0, wait)
+
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+
+    return delay
+
+
+def make_request(url, retry=4, wait=2, return_error=False):
+    """
+    Make a GET request to the specified URL with retry logic.
+    
+    Requests go through a shared pooled session and are throttled by a token
+    bucket per Steam endpoint (see limiter_key). 429, 5xx and connection errors are retried with
+    exponential backoff and jitter.
+    
+    Parameters:
+    - url (str): The URL to make the request to.
+    - retry (int): Number of retries in case of failure.
+    - wait (int): Base seconds to wait before retrying.
+    - return_error (bool): Return the response of a non-retryable error (e.g. 400) instead of None,
+                           so the caller can tell a definitive answer from a failure.
+    
+    Returns:
+    - response (requests.Response): The response object from the request.
+    """
+    session = get_session()
+    limiter = get_limiter(url)
+
+    for attempt in range(retry):
+        limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=30)
+            record_request(url, response.status_code, time.perf_counter() - started, len(response.content))
+            if response.status_code == 200:
+                return response
+            elif response.status_code in RETRY_STATUS:
+                delay = _backoff_delay(attempt, wait, response)
+                if response.status_code == 429:
+                    # Other callers of the endpoint still have to back off, even when this one gives up
+                    limiter.block(delay)
+                if attempt == retry - 1:
+                    print(f'Error fetching data: {response.status_code}')
+                    break
+                record_retry(url, response.status_code)
+                print(f'Error fetching data: {response.status_code}. Waiting for {delay:.1f} seconds before retrying...')
+                if response.status_code != 429:
+                    time.sleep(delay)
+            else:
+                if return_error:
+                    return response
+                print(f'Error fetching data: {response.status_code}')
+                break
+        except requests.exceptions.RequestException as e:
+            record_request(url, 'error', time.perf_counter() - started)
+            if attempt == retry - 1:
+                print(f'Error connecting to API: {e}')
+                break
+            record_retry(url, 'error')
+            delay = _backoff_delay(attempt, wait)
+            print(f'Error connecting to API: {e}. Waiting for {delay:.1f} seconds before retrying...')
+            time.sleep(delay)
+    
+    print(f'[make_resquest] failed to connect to API')
+    return None
@@ -0,0 +1,87 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+#---------------------------------- JSON decoding ----------------------------------#
+#
+# Steam answers are decoded straight from the response bytes, with orjson when
+# it is installed (pip install orjson) and the standard library otherwise:
+# response.json() first decodes the body to str, guessing its charset, then
+# parses the copy.
+#
+# Large payloads are projected right after parsing: only the fields the
+# extractor stores are kept, so the HTML descriptions, requirements,
+# screenshots and per-platform playtimes are released before the next request
+# instead of travelling through the cache and pandas. This is a memory saving:
+# rebuilding every entry costs about what orjson saves on the parse, so the
+# decode time stays close to response.json() (see benchmarks/bench_json.py).
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+# GetOwnedGames entries, as read by build_game_frame
+OWNED_GAME_FIELDS = (
+    'appid', 'name', 'playtime_forever', 'img_icon_url', 'has_community_visible_stats', 'rtime_last_played', 'playtime_2weeks',
+)
+
+# appdetails 'data' fields stored in game_metadata by extract_game_metadatas
+APPDETAILS_FIELDS = (
+    'steam_appid', 'name', 'required_age', 'is_free', 'dlc', 'about_the_game', 'short_description', 'supported_languages',
+    'header_image', 'website', 'developers', 'publishers', 'genres', 'categories', 'movies',
+)
+
+
+def loads(content):
+    """
+    Parse a JSON document from bytes or str with the fastest available parser.
+    """
+
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+def project(record, fields):
+    """
+    Keep only the given fields of a dict. Missing fields stay missing.
+    """
+
+    return {field: record[field] for field in fields if field in record}
+
+
+def decode_owned_games(content):
+    """
+    Decode a GetOwnedGames answer, keeping only OWNED_GAME_FIELDS of every game.
+
+    Returns:
+    - json_games_info (dict): {'response': {'game_count': ..., 'games': [...]}}, shaped like the API answer.
+    """
+
+    json_games_info = loads(content)
+    games = (json_games_info.get('response') or {}).get('games')
+
+    # In place: every full entry is released as soon as its projection exists, so the peak stays close to one parse
+    for i, game in enumerate(games or ()):
+        games[i] = project(game, OWNED_GAME_FIELDS)
+
+    return json_games_info
+
+
+def decode_appdetails(content, appid):
+    """
+    Decode an appdetails answer for one appid, keeping only APPDETAILS_FIELDS of its data.
+
+    Returns:
+    - data (dict): The projected store data, or None when the store answered success: false.
+    """
+
+    json_response = loads(content).get(str(appid)) or {}
+
+    if not json_response.get('success') or not json_response.get('data'):
+        return None
+
+    return project(json_response['data'], APPDETAILS_FIELDS)
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import atexit
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+
+
+#---------------------------------- Run instrumentation ----------------------------------#
+#
+# Process-wide counters filled by make_request, the pipeline stages and the
+# database writers, dumped as a JSON report at the end of a run:
+#
+#   requests  per endpoint: count, status codes, retries, 429s, bytes, latency histogram
+#   stages    per stage: calls and wall time
+#   rows      per table: rows written
+#
+# Entry points call instrument_run once. Set STEAM_PROFILE to a file path to
+# also dump cProfile stats of the run.
+
+REPORT_DIR = os.getenv('STEAM_METRICS_DIR', 'reports')
+PROFILE_PATH = os.getenv('STEAM_PROFILE')
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_requests = {}
+_stages = {}
+_rows = {}
+_started = time.time()
+
+
+def endpoint_name(url):
+    """
+    Group URLs by host and API method, without query string or version (e.g. 'api.steampowered.com/ISteamUserStats/GetPlayerAchievements').
+    """
+
+    parsed = urlparse(url)
+    parts = [part for part in parsed.path.split('/') if part and not (part.startswith('v') and part[1:].isdigit())]
+
+    return '/'.join([parsed.hostname or ''] + parts)
+
+
+def _endpoint(url):
+    return _endpoint_by_name(endpoint_name(url))
+
+
+def _endpoint_by_name(name):
+    if name not in _requests:
+        _requests[name] = {
+            'count': 0,
+            'status': {},
+            'retries': 0,
+            'throttled': 0,
+            'errors': 0,
+            'bytes': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+        }
+
+    return _requests[name]
+
+
+def record_request(url, status, seconds, nbytes=0):
+    """
+    Record one HTTP attempt.
+
+    Parameters:
+    - url (str): The requested URL.
+    - status (int or str): The HTTP status code, or 'error' when no response was received.
+    - seconds (float): Time spent waiting for the response.
+    - nbytes (int): Size of the response body.
+    """
+
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+
+    with _lock:
+        endpoint = _endpoint(url)
+        endpoint['count'] += 1
+        endpoint['status'][str(status)] = endpoint['status'].get(str(status), 0) + 1
+        endpoint['errors'] += int(status == 'error')
+        endpoint['bytes'] += nbytes
+        endpoint['latency_total'] += seconds
+        endpoint['latency_max'] = max(endpoint['latency_max'], seconds)
+        endpoint['latency_histogram'][bucket] += 1
+
+
+def record_retry(url, status):
+    """
+    Record a retried attempt. 429 answers are also counted as throttled.
+    """
+
+    with _lock:
+        endpoint = _endpoint(url)
+        endpoint['retries'] += 1
+        endpoint['throttled'] += int(status == 429)
+
+
+def record_rows(table_name, rows):
+    """
+    Add rows written to a table.
+    """
+
+    with _lock:
+        _rows[table_name] = _rows.get(table_name, 0) + int(rows)
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block of the run under the given stage name. Nested and repeated stages are summed per name.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            entry = _stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += elapsed
+
+
+def reset():
+    """
+    Forget everything recorded so far.
+    """
+
+    global _started
+
+    with _lock:
+        _requests.clear()
+        _stages.clear()
+        _rows.clear()
+        _started = time.time()
+
+
+def report():
+    """
+    Build the run report.
+
+    Returns:
+    - report (dict): started_at, wall_seconds, requests, stages and rows_written.
+    """
+
+    with _lock:
+        requests = {}
+        for name, endpoint in _requests.items():
+            requests[name] = dict(endpoint)
+            requests[name]['status'] = dict(endpoint['status'])
+            requests[name]['latency_mean'] = endpoint['latency_total'] / endpoint['count'] if endpoint['count'] else 0.0
+            requests[name]['latency_histogram'] = {
+                f'le_{bound}': count for bound, count in zip(list(LATENCY_BUCKETS) + ['inf'], endpoint['latency_histogram'])
+            }
+
+        return {
+            'started_at': datetime.fromtimestamp(_started).isoformat(),
+            'wall_seconds': round(time.time() - _started, 3),
+            'requests': requests,
+            'stages': {name: dict(entry) for name, entry in _stages.items()},
+            'rows_written': dict(_rows),
+        }
+
+
+def merge_report(other):
+    """
+    Add the counters of a report built in another process (e.g. a crawl worker) to this one.
+    """
+
+    with _lock:
+        for name, endpoint in other.get('requests', {}).items():
+            entry = _endpoint_by_name(name)
+            for key in ('count', 'retries', 'throttled', 'errors', 'bytes', 'latency_total'):
+                entry[key] += endpoint[key]
+            entry['latency_max'] = max(entry['latency_max'], endpoint['latency_max'])
+            for status, count in endpoint['status'].items():
+                entry['status'][status] = entry['status'].get(status, 0) + count
+            for i, count in enumerate(endpoint['latency_histogram'].values()):
+                entry['latency_histogram'][i] += count
+
+        for name, other_entry in other.get('stages', {}).items():
+            entry = _stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            entry['calls'] += other_entry['calls']
+            entry['seconds'] += other_entry['seconds']
+
+        for table_name, rows in other.get('rows_written', {}).items():
+            _rows[table_name] = _rows.get(table_name, 0) + rows
+
+
+def write_report(run_name, path=None):
+    """
+    Write the run report as JSON.
+
+    Parameters:
+    - run_name (str): Name of the entry point, used in the default file name.
+    - path (str): Target file. Defaults to REPORT_DIR/<run_name>_<timestamp>.json.
+
+    Returns:
+    - path (str): The written file.
+    """
+
+    if path is None:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(report(), run=run_name), f, indent=2)
+
+    return path
+
+
+def instrument_run(run_name, report_path=None, profile_path=PROFILE_PATH):
+    """
+    Write the JSON report when the process exits, and profile the whole run with cProfile when profile_path is set.
+
+    Parameters:
+    - run_name (str): Name of the entry point, used in the default report file name.
+    - report_path (str): Report file. Defaults to REPORT_DIR/<run_name>_<timestamp>.json.
+    - profile_path (str): cProfile stats file (read it with pstats or snakeviz). Defaults to $STEAM_PROFILE.
+    """
+
+    profiler = None
+
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            print(f'Profile written to {profile_path}')
+
+        print(f'Run report written to {write_report(run_name, report_path)}')
+
+    atexit.register(finish)
@@ -0,0 +1,266 @@
+import pandas as pd
+from datetime import datetime
+
+from utilities.steam_api import get_user_info, get_users_info_batch, get_owned_games, get_games_achievements_batch, extract_game_metadatas
+from utilities.storage import save_to_sqlite, save_player_achievements, split_games_by_watermark, update_game_watermarks, stream_achievements_to_stage, load_achievement_stage, clear_achievement_stage
+from utilities.transform import build_user_frame, build_game_frame, build_achievement_counts, flatten_achievements, join_achievement_counts
+from utilities.metrics import stage
+
+
+#---------------------------------- Extraction pipeline ----------------------------------#
+
+def extract_user_profile(steam_user_id, api_key):
+    """
+    Get the profile of a Steam user shaped as profile_data.
+
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+
+    Returns:
+    - df_user_final (pd.DataFrame): The user profile, or None if it could not be fetched.
+    """
+
+    json_user_info = get_user_info(steam_user_id, api_key)
+
+    if json_user_info is None or not json_user_info.get('response').get('players'):
+        return None
+
+    return build_user_frame(json_user_info.get('response').get('players')[:1])
+
+#----------------------------------------------------------------------
+
+def extract_user_profiles(steam_user_ids, api_key):
+    """
+    Get the profiles of many Steam users with batched GetPlayerSummaries calls.
+
+    Parameters:
+    - steam_user_ids (list): The Steam user IDs.
+    - api_key (str): The API key for Steam API.
+
+    Returns:
+    - df_user_final (pd.DataFrame): One row per profile found, shaped as profile_data, or None if no profile was found.
+    """
+
+    with stage('fetch_profiles'):
+        players_info = get_users_info_batch(steam_user_ids, api_key)
+
+    if not players_info:
+        return None
+
+    return build_user_frame(players_info)
+
+#----------------------------------------------------------------------
+
+def extract_user_games(steam_user_id, api_key, max_workers=8, incremental=False, show_progress=True, stream=True):
+    """
+    Get the played games of a Steam user, enriched with achievement counts.
+
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    - max_workers (int): Maximum number of achievement requests in flight.
+    - incremental (bool): Only refetch achievements of games changed since the last run.
+    - show_progress (bool): Display a tqdm progress bar while fetching achievements.
+    - stream (bool): Write achievement counts to the raw database in chunks as they arrive, so an interrupted run can resume.
+                     When False the payloads are kept in memory until the library is complete.
+
+    Returns:
+    - df_final (pd.DataFrame): One row per played game with achievements, or None if the library could not be fetched.
+    """
+
+    with stage('fetch_owned_games'):
+        json_games_info = get_owned_games(steam_user_id, api_key)
+    games_info = json_games_info.get('response').get('games') if json_games_info is not None else None
+
+    if games_info is None:
+        print(f'No games found for Steam ID {steam_user_id}. Please check the ID or if you profile is public.')
+        return None
+
+    with stage('transform_games'):
+        df_game_information_filtered, df_game_information_final = build_game_frame(games_info, steam_user_id)
+
+    #------------------------------------#Get list of game achievements #
+
+    appid_list = df_game_information_final['steam_game_id'].tolist()
+    df_reused_achievements = None
+
+    if incremental:
+        appid_list, df_reused_achievements = split_games_by_watermark(steam_user_id, df_game_information_filtered)
+        print(f'Incremental mode: {len(appid_list)} games changed since last run, {len(df_reused_achievements)} reused from the database.')
+
+    if stream:
+        with stage('fetch_achievements'):
+            no_information_games, failed_games = stream_achievements_to_stage(
+                steam_user_id,
+                api_key,
+                appid_list,
+                max_workers=max_workers,
+                show_progress=show_progress
+            )
+
+        df_achievements_raw = load_achievement_stage(steam_user_id)
+    else:
+        with stage('fetch_achievements'):
+            collect_achievements_info, no_information_games, failed_games = get_games_achievements_batch(
+                steam_user_id,
+                api_key,
+                appid_list,
+                max_workers=max_workers,
+                show_progress=show_progress
+            )
+
+        with stage('transform_achievements'):
+            df_achievements_raw = build_achievement_counts(collect_achievements_info, steam_user_id)
+
+    print(f'\ntotal games whith no achievements: {len(no_information_games)}')
+
+    if failed_games:
+        print(f'total games whose achievements could not be fetched: {len(failed_games)}')
+
+    # Only games with counts, or known to have no stats, get a watermark: the others are requested again next run
+    settled_appids = _settled_appids(appid_list, df_achievements_raw, no_information_games)
+
+    update_game_watermarks(steam_user_id, df_game_information_filtered, df_achievements_raw, settled_appids)
+
+    df_final = _join_games(df_game_information_final, df_achievements_raw, df_reused_achievements)
+
+    if stream:
+        clear_achievement_stage(steam_user_id)
+
+    return df_final
+
+#----------------------------------------------------------------------
+
+def _settled_appids(appid_list, df_achievements_raw, no_information_games):
+    """
+    The appids of a run whose achievement state is known: counted in df_achievements_raw, or without stats.
+    """
+
+    known = set(df_achievements_raw['steam_game_id'].astype(int)) | {int(appid) for appid in no_information_games}
+
+    return [appid for appid in appid_list if int(appid) in known]
+
+#----------------------------------------------------------------------
+
+def _join_games(df_game_information_final, df_achievements_raw, df_reused_achievements=None):
+    """
+    Join the played games with their achievement counts, shaped as collection_game_data.
+    """
+
+    if df_reused_achievements is not None:
+        df_achievements_raw = pd.concat([df_achievements_raw, df_reused_achievements], ignore_index=True)
+
+    return join_achievement_counts(df_game_information_final, df_achievements_raw)
+
+#----------------------------------------------------------------------
+
+def crawl_user_games(steam_user_id, api_key, max_workers=8, incremental=False):
+    """
+    Fetch and transform the games of a Steam user without writing anything, so it can run in a worker process.
+
+    The incremental watermarks are only read. The result is written by write_user_crawl, in a single process.
+
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    - max_workers (int): Maximum number of achievement requests in flight.
+    - incremental (bool): Only refetch achievements of games changed since the last run.
+
+    Returns:
+    - crawl (dict): df_final, df_games, df_achievements_raw, df_player_achievement, fetched_appids, settled_appids and the
+                    no_information_games / failed_games counts, or None if the library could not be fetched.
+    """
+
+    with stage('fetch_owned_games'):
+        json_games_info = get_owned_games(steam_user_id, api_key)
+    games_info = json_games_info.get('response').get('games') if json_games_info is not None else None
+
+    if games_info is None:
+        print(f'No games found for Steam ID {steam_user_id}. Please check the ID or if you profile is public.')
+        return None
+
+    with stage('transform_games'):
+        df_game_information_filtered, df_game_information_final = build_game_frame(games_info, steam_user_id)
+
+    appid_list = df_game_information_final['steam_game_id'].tolist()
+    df_reused_achievements = None
+
+    if incremental:
+        appid_list, df_reused_achievements = split_games_by_watermark(steam_user_id, df_game_information_filtered)
+
+    with stage('fetch_achievements'):
+        collect_achievements_info, no_information_games, failed_games = get_games_achievements_batch(
+            steam_user_id,
+            api_key,
+            appid_list,
+            max_workers=max_workers,
+            show_progress=False
+        )
+
+    with stage('transform_achievements'):
+        df_player_achievement = flatten_achievements(collect_achievements_info, steam_user_id)
+        df_achievements_raw = build_achievement_counts(collect_achievements_info, steam_user_id, df_player_achievement)
+
+    return {
+        'df_final': _join_games(df_game_information_final, df_achievements_raw, df_reused_achievements),
+        'df_games': df_game_information_filtered,
+        'df_achievements_raw': df_achievements_raw,
+        'df_player_achievement': df_player_achievement,
+        'fetched_appids': [payload['appid'] for payload in collect_achievements_info],
+        'settled_appids': _settled_appids(appid_list, df_achievements_raw, no_information_games),
+        'no_information_games': len(no_information_games),
+        'failed_games': len(failed_games),
+    }
+
+#----------------------------------------------------------------------
+
+def write_user_crawl(steam_user_id, crawl, method='append', save_games=True):
+    """
+    Write the result of crawl_user_games to the raw database: games, player achievements and watermarks.
+
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - crawl (dict): The output of crawl_user_games.
+    - method (str): 'append' or 'cdc', passed to save_to_sqlite for collection_game_data.
+    - save_games (bool): Also write df_final to collection_game_data. False when the games are exported to files instead,
+                         the player achievements and watermarks are written either way.
+    """
+
+    if save_games:
+        save_to_sqlite(crawl['df_final'], table_name='collection_game_data', method=method)
+    save_player_achievements(steam_user_id, crawl['df_player_achievement'], crawl['fetched_appids'])
+    update_game_watermarks(steam_user_id, crawl['df_games'], crawl['df_achievements_raw'], crawl['settled_appids'])
+
+#----------------------------------------------------------------------
+
+def extract_metadata(game_ids):
+    """
+    Get store metadata for a set of games, shared across every user of the run.
+
+    Parameters:
+    - game_ids (iterable): The appids to enrich.
+
+    Returns:
+    - df_game_metadata (pd.DataFrame): One row per game found in the store, or None on error.
+    """
+
+    str_list = [str(item) for item in dict.fromkeys(game_ids)]
+
+    if not str_list:
+        return None
+
+    try:
+        print('\nExtracting game metadatas for game data enrichment')
+        with stage('fetch_metadata'):
+            df_game_metadata, num_not_found = extract_game_metadatas(str_list)
+
+        # dh_updated added to metadata dataframe
+        df_game_metadata['dh_updated'] = datetime.now()
+
+        print(f'Total games with no metadata found: {num_not_found}, {num_not_found/len(str_list)*100:.2f}%')
+    except Exception as e:
+        print(f'Error extracting game metadatas: {e}')
+        df_game_metadata = None
+
+    return df_game_metadata
@@ -0,0 +1,246 @@
+import os
+import sqlite3
+
+
+#---------------------------------- Raw layer schema ----------------------------------#
+#
+# Explicit DDL for the raw tables written by save_to_sqlite. The column layout
+# matches what pandas used to create, so existing databases stay compatible;
+# keys and indexes are declared as (unique) indexes so they can also be added
+# to tables created before this schema existed.
+
+RAW_DB_PATH = os.getenv('STEAM_RAW_DB', 'database/steam_data_raw.db')
+
+RAW_TABLE_DDL = {
+    'collection_game_data': """
+        CREATE TABLE IF NOT EXISTS {schema}.collection_game_data
+        (
+            steam_user_id_x TEXT,
+            steam_game_id INTEGER,
+            name TEXT,
+            last_played_timestamp TIMESTAMP,
+            playtime_forever INTEGER,
+            img_game_cover_url TEXT,
+            playtime_2weeks REAL,
+            dh_updated TIMESTAMP,
+            total_game_acheivements INTEGER,
+            total_game_acheivements_unlocked INTEGER,
+            row_hash TEXT,
+            valid_from TIMESTAMP,
+            valid_to TIMESTAMP
+        )
+    """,
+    'profile_data': """
+        CREATE TABLE IF NOT EXISTS {schema}.profile_data
+        (
+            steamid TEXT,
+            communityvisibilitystate INTEGER,
+            profilestate INTEGER,
+            avatarhash TEXT,
+            personaname TEXT,
+            profileurl TEXT,
+            timecreated TIMESTAMP,
+            lastlogoff TIMESTAMP,
+            loccountrycode TEXT,
+            avatarmedium TEXT,
+            dh_updated TIMESTAMP,
+            row_hash TEXT,
+            valid_from TIMESTAMP,
+            valid_to TIMESTAMP
+        )
+    """,
+    'game_metadata': """
+        CREATE TABLE IF NOT EXISTS {schema}.game_metadata
+        (
+            steam_game_id INTEGER,
+            name TEXT,
+            required_age TEXT,
+            is_free INTEGER,
+            dlc TEXT,
+            about_the_game TEXT,
+            short_description TEXT,
+            supported_languages TEXT,
+            header_image TEXT,
+            website TEXT,
+            developers TEXT,
+            publishers TEXT,
+            genres TEXT,
+            categories TEXT,
+            media TEXT,
+            dh_updated TIMESTAMP,
+            row_hash TEXT,
+            valid_from TIMESTAMP,
+            valid_to TIMESTAMP
+        )
+    """,
+    # Achievement counts written in chunks while the crawl runs, so an
+    # interrupted extraction can resume. Cleared once the user is complete.
+    'achievement_stage': """
+        CREATE TABLE IF NOT EXISTS {schema}.achievement_stage
+        (
+            steam_user_id TEXT,
+            steam_game_id INTEGER,
+            game_name TEXT,
+            total_game_acheivements INTEGER,
+            total_game_acheivements_unlocked INTEGER,
+            dh_updated TIMESTAMP,
+            PRIMARY KEY (steam_user_id, steam_game_id)
+        )
+    """,
+    # One row per achievement of a game owned by a user, current state only
+    'player_achievement': """
+        CREATE TABLE IF NOT EXISTS {schema}.player_achievement
+        (
+            steam_user_id TEXT,
+            steam_game_id INTEGER,
+            apiname TEXT,
+            achieved INTEGER,
+            unlocktime INTEGER,
+            dh_updated TIMESTAMP,
+            PRIMARY KEY (steam_user_id, steam_game_id, apiname)
+        )
+    """,
+}
+
+# Change-data-capture columns, added with ALTER TABLE to tables created before them.
+# A row is the current version of its key while valid_to is NULL.
+CDC_COLUMNS = [('row_hash', 'TEXT'), ('valid_from', 'TIMESTAMP'), ('valid_to', 'TIMESTAMP')]
+
+# Business key of every table that can be written in change-data-capture mode
+CDC_KEY_COLUMNS = {
+    'collection_game_data': ('steam_user_id_x', 'steam_game_id'),
+    'profile_data': ('steamid',),
+    'game_metadata': ('steam_game_id',),
+}
+
+# Column whose rows form a complete snapshot per value: a key absent from the snapshot of its owner is closed.
+# Profiles and metadata are saved for a subset of keys at a time, so their absent keys stay current.
+CDC_OWNER_COLUMN = {
+    'collection_game_data': 'steam_user_id_x',
+}
+
+# (index name, columns, unique). A snapshot is identified by its key and dh_updated.
+RAW_TABLE_INDEXES = {
+    'collection_game_data': [
+        ('pk_collection_game_data', 'steam_user_id_x, steam_game_id, dh_updated', True),
+        ('idx_collection_game_data_user_dh', 'steam_user_id_x, dh_updated', False),
+        ('idx_collection_game_data_game_dh', 'steam_game_id, dh_updated', False),
+        ('idx_collection_game_data_current', 'steam_user_id_x, steam_game_id, valid_to', False),
+    ],
+    'profile_data': [
+        ('pk_profile_data', 'steamid, dh_updated', True),
+        ('idx_profile_data_current', 'steamid, valid_to', False),
+    ],
+    'game_metadata': [
+        ('pk_game_metadata', 'steam_game_id, dh_updated', True),
+        ('idx_game_metadata_current', 'steam_game_id, valid_to', False),
+    ],
+    'player_achievement': [
+        ('idx_player_achievement_status', 'steam_user_id, steam_game_id, achieved', False),
+    ],
+}
+
+
+def ensure_raw_table(conn, table_name, schema='main'):
+    """
+    Create a raw table and its indexes if they do not exist yet.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database (or with it attached).
+    - table_name (str): Name of the raw table.
+    - schema (str): Schema name the raw database is available under.
+
+    Returns:
+    - known (bool): False when the table has no explicit DDL, so the caller must create it itself.
+    """
+
+    if table_name not in RAW_TABLE_DDL:
+        return False
+
+    conn.execute(RAW_TABLE_DDL[table_name].format(schema=schema))
+
+    if table_name in CDC_KEY_COLUMNS:
+        existing = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table_name})")}
+        for column, column_type in CDC_COLUMNS:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {schema}.{table_name} ADD COLUMN {column} {column_type}")
+
+    for index_name, columns, unique in RAW_TABLE_INDEXES.get(table_name, []):
+        try:
+            conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {schema}.{index_name} ON {table_name} ({columns})")
+        except Exception as e:
+            # Older databases may already hold duplicated snapshots: keep them searchable anyway
+            print(f'Could not create unique index {index_name} ({e}), creating a plain index instead.')
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.{index_name} ON {table_name} ({columns})")
+
+    return True
+
+
+def bump_table_generation(conn, table_name):
+    """
+    Record that a raw table was rewritten (saved with method='replace'), so rowid watermarks on it restart.
+
+    Rowids of a rewritten table start over at 1: without this marker a job whose
+    watermark is lower than the new table size would skip its first rows.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database. The caller commits.
+    - table_name (str): Name of the raw table.
+    """
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS raw_table_generation
+        (
+            table_name TEXT PRIMARY KEY,
+            generation INTEGER,
+            dh_updated TIMESTAMP
+        )
+    """)
+    conn.execute(
+        """
+        INSERT INTO raw_table_generation (table_name, generation, dh_updated)
+        VALUES (?, 1, datetime('now', 'localtime'))
+        ON CONFLICT(table_name) DO UPDATE SET
+            generation = generation + 1,
+            dh_updated = excluded.dh_updated
+        """,
+        (table_name,)
+    )
+
+
+def get_table_generation(conn, table_name, schema='main'):
+    """
+    Number of times a raw table was rewritten, 0 if never.
+
+    Parameters:
+    - conn (sqlite3.Connection or sqlite3.Cursor): Connection with the raw database available under schema.
+    - table_name (str): Name of the raw table.
+    - schema (str): Schema name the raw database is available under.
+    """
+
+    exists = conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'raw_table_generation'").fetchone()
+
+    if not exists:
+        return 0
+
+    row = conn.execute(f"SELECT generation FROM {schema}.raw_table_generation WHERE table_name = ?", (table_name,)).fetchone()
+
+    return row[0] if row else 0
+
+
+def connect_raw(db_path=None):
+    """
+    Open the raw database in WAL mode, so readers are not blocked while the extractor writes in chunks.
+
+    Parameters:
+    - db_path (str): Path of the raw database. Defaults to RAW_DB_PATH.
+
+    Returns:
+    - conn (sqlite3.Connection): The open connection.
+    """
+
+    conn = sqlite3.connect(db_path or RAW_DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+    return conn
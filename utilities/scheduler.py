@@ -0,0 +1,415 @@
+import os
+import time
+import heapq
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from utilities.raw_schema import connect_raw, ensure_raw_table
+from utilities.http_client import STEAM_API_BASE
+from utilities.metrics import report
+from utilities.transform import LOCAL_TZ
+
+
+#---------------------------------- Refresh scheduler ----------------------------------#
+#
+# Decides which tracked users to refresh and when, from what the raw database
+# already knows about them:
+#
+#   playtime_2weeks > 0             active      refreshed every ACTIVE_INTERVAL
+#   lastlogoff within 7 days        recent      every RECENT_INTERVAL
+#   lastlogoff within 30 days       idle        every IDLE_INTERVAL
+#   older                           dormant     every DORMANT_INTERVAL
+#
+# Users wait in a heap ordered by due time. When several are due, the most
+# overdue relative to their interval go first, active players before dormant
+# ones, until the daily Web API budget of the key (100,000 calls by default)
+# is spent. Schedule and budget are stored in the raw database, so the
+# scheduler resumes where it stopped.
+
+DAILY_API_BUDGET = int(os.getenv('STEAM_DAILY_API_BUDGET', 100000))
+
+ACTIVE_INTERVAL = float(os.getenv('SCHEDULER_ACTIVE_INTERVAL', 6 * 3600))
+RECENT_INTERVAL = float(os.getenv('SCHEDULER_RECENT_INTERVAL', 24 * 3600))
+IDLE_INTERVAL = float(os.getenv('SCHEDULER_IDLE_INTERVAL', 3 * 24 * 3600))
+DORMANT_INTERVAL = float(os.getenv('SCHEDULER_DORMANT_INTERVAL', 14 * 24 * 3600))
+
+# Tier name, refresh interval and weight of an overdue refresh when the budget is short
+ACTIVITY_TIERS = {
+    'active': (ACTIVE_INTERVAL, 4.0),
+    'recent': (RECENT_INTERVAL, 2.0),
+    'idle': (IDLE_INTERVAL, 1.0),
+    'dormant': (DORMANT_INTERVAL, 0.5),
+}
+
+
+class SystemClock:
+    """
+    Wall clock: now() in Unix seconds, sleep() blocks.
+    """
+
+    def now(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """
+    Clock that jumps forward instead of sleeping, to replay days of scheduling in seconds.
+    """
+
+    def __init__(self, start=None):
+        self.current = time.time() if start is None else start
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += seconds
+
+
+def activity_tier(lastlogoff, playtime_2weeks, now):
+    """
+    Classify a user from their last log off (Unix seconds, or None) and minutes played in the last two weeks.
+    """
+
+    if playtime_2weeks and playtime_2weeks > 0:
+        return 'active'
+
+    if lastlogoff is None:
+        return 'dormant'
+
+    days_away = (now - lastlogoff) / 86400
+
+    if days_away <= 7:
+        return 'recent'
+
+    if days_away <= 30:
+        return 'idle'
+
+    return 'dormant'
+
+
+def api_request_count():
+    """
+    Web API requests made by this process so far (store requests are not part of the key budget).
+    """
+
+    host = urlparse(STEAM_API_BASE).hostname or ''
+
+    return sum(
+        endpoint['count'] for name, endpoint in report()['requests'].items()
+        if name.split('/')[0] == host
+    )
+
+
+def _ensure_scheduler_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS refresh_schedule
+        (
+            steam_user_id TEXT PRIMARY KEY,
+            tier TEXT,
+            last_refresh REAL,
+            next_due REAL,
+            last_cost INTEGER,
+            dh_updated TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS api_budget
+        (
+            day TEXT PRIMARY KEY,
+            requests INTEGER,
+            dh_updated TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def load_activity_signals(conn, steam_user_ids=None):
+    """
+    Read the scheduling signals of every user of the raw database.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database.
+    - steam_user_ids (list): Restrict to these users. Users unknown to the database get no signals.
+
+    Returns:
+    - signals (dict): steam_user_id -> {'lastlogoff', 'playtime_2weeks', 'games', 'dh_updated'}, times in Unix seconds.
+    """
+
+    ensure_raw_table(conn, 'profile_data')
+    ensure_raw_table(conn, 'collection_game_data')
+
+    df_profiles = pd.read_sql_query(
+        """
+        SELECT steamid, lastlogoff, dh_updated
+        FROM (
+            SELECT steamid, lastlogoff, dh_updated,
+                   ROW_NUMBER() OVER (PARTITION BY steamid ORDER BY dh_updated DESC, rowid DESC) AS snapshot_rank
+            FROM profile_data
+            WHERE valid_to IS NULL
+        )
+        WHERE snapshot_rank = 1
+        """,
+        conn
+    )
+
+    # Current games: CDC rows still valid, or the latest appended snapshot of the user
+    df_games = pd.read_sql_query(
+        """
+        SELECT steam_user_id_x AS steamid, SUM(COALESCE(playtime_2weeks, 0)) AS playtime_2weeks, COUNT(*) AS games
+        FROM collection_game_data g
+        WHERE g.valid_to IS NULL
+        AND (
+            g.row_hash IS NOT NULL
+            OR g.dh_updated = (
+                SELECT MAX(m.dh_updated) FROM collection_game_data m
+                WHERE m.steam_user_id_x = g.steam_user_id_x AND m.row_hash IS NULL
+            )
+        )
+        GROUP BY steam_user_id_x
+        """,
+        conn
+    )
+
+    df_signals = pd.merge(df_profiles, df_games, on='steamid', how='left')
+
+    if steam_user_ids is not None:
+        df_signals = df_signals[df_signals['steamid'].isin([str(steam_user_id) for steam_user_id in steam_user_ids])]
+
+    def unix(values):
+        # Stored as naive local times (see transform.unix_to_datetime): localize them before taking the Unix time.
+        # An ambiguous time when clocks go back is read as standard time.
+        local = pd.to_datetime(values, format='ISO8601', errors='coerce').dt.tz_localize(
+            LOCAL_TZ, ambiguous=np.zeros(len(values), dtype=bool), nonexistent='shift_forward'
+        )
+        return [None if pd.isna(value) else value.timestamp() for value in local]
+
+    return {
+        steamid: {'lastlogoff': lastlogoff, 'playtime_2weeks': playtime_2weeks, 'games': games, 'dh_updated': dh_updated}
+        for steamid, lastlogoff, playtime_2weeks, games, dh_updated in zip(
+            df_signals['steamid'],
+            unix(df_signals['lastlogoff']),
+            df_signals['playtime_2weeks'].fillna(0).tolist(),
+            df_signals['games'].fillna(0).astype(int).tolist(),
+            unix(df_signals['dh_updated']),
+        )
+    }
+
+
+class RefreshScheduler:
+    """
+    Priority queue of users to refresh, bounded by a daily Web API budget.
+
+    Parameters:
+    - steam_user_ids (list): The tracked users.
+    - refresh (callable): refresh(steam_user_ids) refreshes a batch of users and returns the Web API requests it made.
+    - clock (SystemClock or SimulatedClock): Time source.
+    - conn (sqlite3.Connection): Raw database the activity signals are read from. Defaults to RAW_DB_PATH.
+    - state_conn (sqlite3.Connection): Where schedule and budget are kept. Defaults to conn; simulations pass an in-memory database.
+    - daily_budget (int): Web API requests allowed per UTC day.
+    - batch_size (int): Maximum users refreshed per tick.
+    """
+
+    def __init__(self, steam_user_ids, refresh, clock=None, conn=None, state_conn=None, daily_budget=DAILY_API_BUDGET, batch_size=20):
+        self.refresh = refresh
+        self.clock = clock or SystemClock()
+        self.conn = conn or connect_raw()
+        self.state_conn = state_conn or self.conn
+        self.daily_budget = daily_budget
+        self.batch_size = batch_size
+        self.heap = []
+        self.signals = {}
+        self.schedule = {}
+
+        _ensure_scheduler_tables(self.state_conn)
+        self.reload(steam_user_ids)
+
+    #------------------------------------ queue
+
+    def reload(self, steam_user_ids):
+        """
+        Read fresh signals for the tracked users and rebuild the queue.
+        """
+
+        self.signals = load_activity_signals(self.conn, steam_user_ids)
+        stored = {
+            row[0]: {'last_refresh': row[1], 'last_cost': row[2]}
+            for row in self.state_conn.execute("SELECT steam_user_id, last_refresh, last_cost FROM refresh_schedule")
+        }
+        now = self.clock.now()
+
+        self.heap = []
+        self.schedule = {}
+
+        for steam_user_id in dict.fromkeys(str(steam_user_id) for steam_user_id in steam_user_ids):
+            signal = self.signals.get(steam_user_id, {})
+            entry = stored.get(steam_user_id, {})
+            # Never extracted: due right away
+            last_refresh = entry.get('last_refresh') or signal.get('dh_updated') or 0
+            self._schedule(steam_user_id, last_refresh, entry.get('last_cost'), now)
+
+    def _schedule(self, steam_user_id, last_refresh, last_cost, now):
+        signal = self.signals.get(steam_user_id, {})
+        tier = activity_tier(signal.get('lastlogoff'), signal.get('playtime_2weeks'), now)
+        interval = ACTIVITY_TIERS[tier][0]
+
+        self.schedule[steam_user_id] = {
+            'tier': tier,
+            'last_refresh': last_refresh,
+            'next_due': last_refresh + interval,
+            # One profile share, the owned games and one request per game with stats at most
+            'cost': last_cost if last_cost is not None else 2 + signal.get('games', 0),
+        }
+        heapq.heappush(self.heap, (last_refresh + interval, steam_user_id))
+
+    def value(self, steam_user_id, now):
+        """
+        How much a refresh of this user is worth now: lateness relative to its interval, weighted by activity.
+        """
+
+        entry = self.schedule[steam_user_id]
+        interval, weight = ACTIVITY_TIERS[entry['tier']]
+
+        return weight * (now - entry['last_refresh']) / interval
+
+    def due(self, now):
+        """
+        Pop the users due at the given time, most valuable first.
+        """
+
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            next_due, steam_user_id = heapq.heappop(self.heap)
+            # Stale heap entry of a user rescheduled since
+            if self.schedule[steam_user_id]['next_due'] == next_due:
+                due.append(steam_user_id)
+
+        return sorted(due, key=lambda steam_user_id: self.value(steam_user_id, now), reverse=True)
+
+    #------------------------------------ budget
+
+    def _day(self, now):
+        return datetime.fromtimestamp(now, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def used_budget(self, now):
+        row = self.state_conn.execute("SELECT requests FROM api_budget WHERE day = ?", (self._day(now),)).fetchone()
+        return row[0] if row else 0
+
+    def spend_budget(self, now, requests):
+        self.state_conn.execute(
+            """
+            INSERT INTO api_budget (day, requests, dh_updated)
+            VALUES (?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                requests = requests + excluded.requests,
+                dh_updated = excluded.dh_updated
+            """,
+            (self._day(now), int(requests), str(datetime.now()))
+        )
+        self.state_conn.commit()
+
+    #------------------------------------ loop
+
+    def tick(self):
+        """
+        Refresh the due users that fit in the remaining budget of the day.
+
+        Returns:
+        - refreshed (list): The refreshed Steam user IDs, in refresh order.
+        """
+
+        now = self.clock.now()
+        due = self.due(now)
+        remaining = self.daily_budget - self.used_budget(now)
+
+        batch = []
+        for steam_user_id in due:
+            cost = self.schedule[steam_user_id]['cost']
+            if len(batch) < self.batch_size and cost <= remaining:
+                batch.append(steam_user_id)
+                remaining -= cost
+            else:
+                # Still due: waits for the next tick, or for tomorrow's budget
+                heapq.heappush(self.heap, (self.schedule[steam_user_id]['next_due'], steam_user_id))
+
+        if not batch:
+            return []
+
+        spent = self.refresh(batch)
+        self.spend_budget(now, spent)
+
+        # The refresh wrote new lastlogoff / playtime_2weeks: the next interval follows them
+        self.signals.update(load_activity_signals(self.conn, batch))
+
+        # Split the measured cost evenly: the next estimate of each user follows its real size
+        cost = max(1, round(spent / len(batch)))
+        finished = self.clock.now()
+
+        for steam_user_id in batch:
+            self._schedule(steam_user_id, finished, cost, finished)
+            entry = self.schedule[steam_user_id]
+            self.state_conn.execute(
+                """
+                INSERT INTO refresh_schedule (steam_user_id, tier, last_refresh, next_due, last_cost, dh_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(steam_user_id) DO UPDATE SET
+                    tier = excluded.tier,
+                    last_refresh = excluded.last_refresh,
+                    next_due = excluded.next_due,
+                    last_cost = excluded.last_cost,
+                    dh_updated = excluded.dh_updated
+                """,
+                (steam_user_id, entry['tier'], finished, entry['next_due'], cost, str(datetime.now()))
+            )
+        self.state_conn.commit()
+
+        return batch
+
+    def next_wake(self, poll_interval):
+        """
+        Seconds to wait before the next tick: until the next user is due, or the next UTC day when the due users wait for budget.
+        """
+
+        now = self.clock.now()
+
+        if not self.heap:
+            return poll_interval
+
+        if self.heap[0][0] <= now:
+            wake = (now // 86400 + 1) * 86400
+        else:
+            wake = self.heap[0][0]
+
+        return max(1.0, min(poll_interval, wake - now))
+
+    def run(self, until=None, poll_interval=300, reload_every=24 * 3600, on_refresh=None):
+        """
+        Refresh users as they become due, forever or until the clock reaches `until`.
+
+        Parameters:
+        - until (float): Unix time to stop at. Defaults to never.
+        - poll_interval (float): Maximum seconds between two ticks.
+        - reload_every (float): Seconds between two reloads of the activity signals from the database.
+        - on_refresh (callable): on_refresh(now, steam_user_ids) called after every refreshed batch.
+        """
+
+        steam_user_ids = list(self.schedule)
+        last_reload = self.clock.now()
+
+        while until is None or self.clock.now() < until:
+            refreshed = self.tick()
+
+            if refreshed and on_refresh is not None:
+                on_refresh(self.clock.now(), refreshed)
+
+            if self.clock.now() - last_reload >= reload_every:
+                self.reload(steam_user_ids)
+                last_reload = self.clock.now()
+
+            if not refreshed:
+                self.clock.sleep(self.next_wake(poll_interval))
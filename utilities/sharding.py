@@ -0,0 +1,82 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from utilities.http_client import create_shared_limiters, install_limiters
+from utilities.pipeline import crawl_user_games
+from utilities.metrics import merge_report, report, reset
+
+
+#---------------------------------- Sharded crawl ----------------------------------#
+#
+# Past a few thousand users a single process is bound by JSON decoding and
+# pandas work, not by the network. crawl_users_sharded spreads the users over
+# a pool of worker processes:
+#
+#   workers   fetch + transform one user at a time (crawl_user_games), no database access
+#             besides reading the incremental watermarks
+#   parent    the only writer of the raw database, fed as users complete
+#
+# Every process throttles through the same shared-memory token buckets, so the
+# per-endpoint Steam limits hold for the whole pool, not per process.
+
+def _init_worker(limiters):
+    install_limiters(limiters)
+
+
+def _crawl_worker(steam_user_id, api_key, max_workers, incremental):
+    # Each task reports only its own requests and stages, merged by the parent
+    reset()
+    crawl = crawl_user_games(steam_user_id, api_key, max_workers=max_workers, incremental=incremental)
+
+    return crawl, report()
+
+
+def crawl_users_sharded(steam_user_ids, api_key, procs=4, max_workers=8, incremental=False):
+    """
+    Crawl the games of many users in worker processes, yielding each result as it completes.
+
+    Parameters:
+    - steam_user_ids (list): The Steam user IDs.
+    - api_key (str): The API key for Steam API.
+    - procs (int): Number of worker processes.
+    - max_workers (int): Maximum number of achievement requests in flight per worker.
+    - incremental (bool): Only refetch achievements of games changed since the last run.
+
+    Yields:
+    - (steam_user_id, crawl): crawl is the output of crawl_user_games, or None if the user failed.
+    """
+
+    # spawn: forking a process that holds a connection pool and locks is not safe
+    context = multiprocessing.get_context('spawn')
+
+    limiters = create_shared_limiters(context)
+    install_limiters(limiters)
+    pending_ids = iter(steam_user_ids)
+    in_flight = {}
+
+    with ProcessPoolExecutor(max_workers=procs, mp_context=context, initializer=_init_worker, initargs=(limiters,)) as pool:
+
+        def submit_next():
+            steam_user_id = next(pending_ids, None)
+            if steam_user_id is not None:
+                in_flight[pool.submit(_crawl_worker, steam_user_id, api_key, max_workers, incremental)] = steam_user_id
+
+        # Keep a couple of users queued per worker so finished results do not pile up in the parent
+        for _ in range(procs * 2):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                steam_user_id = in_flight.pop(future)
+                submit_next()
+
+                try:
+                    crawl, worker_report = future.result()
+                    merge_report(worker_report)
+                except Exception as e:
+                    print(f'Error crawling Steam ID {steam_user_id}: {e}')
+                    crawl = None
+
+                yield steam_user_id, crawl
@@ -0,0 +1,484 @@
+import json
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+
+from utilities.http_client import make_request, STEAM_API_BASE, STEAM_STORE_BASE
+from utilities.json_codec import loads, decode_owned_games, decode_appdetails
+from utilities.cache import connect_cache, get_cached_appdetails, store_appdetails, get_cached_schemas, store_schemas
+from utilities.raw_schema import connect_raw
+from utilities.checkpoint import start_checkpoint, mark_checkpoint, clear_checkpoint, CHECKPOINT_MAX_RETRIES, DONE, FAILED, NO_STATS
+
+
+#---------------------------------- Steam endpoints ----------------------------------#
+
+def get_user_id_by_vanity(api_key):
+    """
+    Get Steam user ID by vanity URL.
+    
+    Parameters:
+    - api_key (str): The API key for Steam API.
+    
+    Returns:
+    - steam_user_id (str): The Steam user ID.
+    """
+
+    print("Welcome to the Steam Data Extractor!")
+    print("This tool allows you to extract Steam user data and game achievements.\n")
+    print("Please select how you want to identify the user:")
+
+    while True:
+        try:
+            input_option = int(input('Select an option:\n1. By Steam ID\n2. By Vanity URL\n'))
+            
+            if input_option in(1, 2):
+                break
+            else:
+                print('Invalid option. Please select 1 or 2.')
+        except ValueError:
+            print('Invalid input. Please enter a number.')
+
+    if input_option == 1:
+        steam_user_id = input('Enter the Steam ID (ex 7656119...): ')
+        print(f'You selected to identify by Steam ID: {steam_user_id}')
+        return steam_user_id
+    elif input_option == 2:
+        vanity_name = input('Please enter the name present in your profile URL: ')
+        steam_user_id = resolve_vanity_url(vanity_name, api_key)
+
+        if steam_user_id is None:
+            print(f'Error: Vanity URL not found or does not exist. Please check the vanity name: {vanity_name} or use your Steam ID.')
+        return steam_user_id
+
+#----------------------------------------------------------------------
+
+def resolve_vanity_url(vanity_name, api_key):
+    """
+    Resolve a profile vanity name to a Steam user ID.
+    
+    Parameters:
+    - vanity_name (str): The name present in the profile URL.
+    - api_key (str): The API key for Steam API.
+    
+    Returns:
+    - steam_user_id (str): The Steam user ID, or None if the vanity name does not exist.
+    """
+
+    vanity_url = f'{STEAM_API_BASE}/ISteamUser/ResolveVanityURL/v0001/?key={api_key}&vanityurl={vanity_name}'
+
+    response = make_request(vanity_url, retry=4, wait=2)
+
+    if response is not None and response.status_code == 200:
+        json_vanity_info = loads(response.content)
+        if json_vanity_info.get('response').get('success') == 1:
+            return json_vanity_info.get('response').get('steamid')
+
+    return None
+        
+#----------------------------------------------------------------------
+
+def get_user_info(steam_user_id, api_key):
+    """
+    Get user information from Steam API by user ID.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    
+    Returns:
+    - json_user_info (dict): The JSON response containing user information.
+    """
+    
+    url = f'{STEAM_API_BASE}/ISteamUser/GetPlayerSummaries/v0002/?key={api_key}&steamids={steam_user_id}'
+    response = make_request(url, retry=4, wait=2)
+
+    if response is not None and response.status_code == 200:
+        json_user_info = loads(response.content)
+        return json_user_info
+    else:
+        print(f'Error fetching user information for Steam ID {steam_user_id}. Please check the ID or your API key.')
+        return None
+    
+
+#----------------------------------------------------------------------
+
+def get_users_info_batch(steam_user_ids, api_key, chunk_size=100):
+    """
+    Get user information for many Steam IDs, up to 100 IDs per GetPlayerSummaries request.
+    
+    Parameters:
+    - steam_user_ids (list): The Steam user IDs.
+    - api_key (str): The API key for Steam API.
+    - chunk_size (int): Number of IDs sent per request (the API accepts at most 100).
+    
+    Returns:
+    - players_info (list): The 'players' entries of every chunk. Unknown IDs are simply missing.
+    """
+
+    players_info = []
+    steam_user_ids = [str(steam_user_id) for steam_user_id in steam_user_ids]
+
+    for i in range(0, len(steam_user_ids), chunk_size):
+        chunk = steam_user_ids[i:i + chunk_size]
+        json_user_info = get_user_info(','.join(chunk), api_key)
+
+        if json_user_info is None:
+            continue
+
+        players_info.extend(json_user_info.get('response').get('players', []))
+
+    return players_info
+
+#----------------------------------------------------------------------
+
+def resolve_vanity_urls(vanity_names, api_key, max_workers=8):
+    """
+    Resolve many vanity names concurrently.
+    
+    Parameters:
+    - vanity_names (list): The names present in the profile URLs.
+    - api_key (str): The API key for Steam API.
+    - max_workers (int): Maximum number of requests in flight at the same time.
+    
+    Returns:
+    - resolved (dict): vanity name -> Steam user ID, or None when the name does not exist.
+    """
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(resolve_vanity_url, name, api_key): name for name in vanity_names}
+        return {futures[future]: future.result() for future in as_completed(futures)}
+
+#----------------------------------------------------------------------
+
+def get_owned_games(steam_user_id, api_key):
+    """
+    Get the list of owned games by a Steam user.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    
+    Returns:
+    - json_games_info (dict): The JSON response containing game information, with only the fields used by the extractor.
+    """
+    
+    games_info_url = f'{STEAM_API_BASE}/IPlayerService/GetOwnedGames/v0001/?key={api_key}&steamid={steam_user_id}&include_appinfo=true&include_played_free_games=true&format=json'
+    
+    response = make_request(games_info_url, retry=4, wait=2)
+
+    if response is not None and response.status_code == 200:
+        json_games_info = decode_owned_games(response.content)
+        return json_games_info
+    else:
+        print(f'Error fetching owned games for Steam ID {steam_user_id}. Please check the ID or your API key.')
+        return None
+    
+
+#----------------------------------------------------------------------
+
+def get_game_achievements(steam_user_id, api_key, appid):
+    """
+    Get the achievements for a specific game by appid.
+    
+    Only apiname / achieved / unlocktime are returned: names and descriptions
+    are the same for every player and come from get_game_schemas.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    - appid (int): The application ID of the game.
+    
+    Returns:
+    - json_game_achievements (dict): The JSON response containing game achievements.
+      Games without stats return {'playerstats': {'success': False, 'error': ...}}; None means the request failed.
+    """
+    
+    game_achievements_url = f'{STEAM_API_BASE}/ISteamUserStats/GetPlayerAchievements/v0001/?appid={appid}&key={api_key}&steamid={steam_user_id}'
+    response = make_request(game_achievements_url, retry=4, wait=2, return_error=True)
+
+    if response is not None and response.status_code == 200:
+        json_game_achievements = loads(response.content)
+        return json_game_achievements
+    elif response is not None and response.status_code == 400:
+        # "Requested app has no stats": a definitive answer, not a failure
+        try:
+            json_game_achievements = loads(response.content)
+        except ValueError:
+            json_game_achievements = {}
+        return {'playerstats': {'success': False, 'error': (json_game_achievements.get('playerstats') or {}).get('error', 'no stats')}}
+    else:
+        print(f'Error fetching achievements for appid {appid}. Please check the appid or your API key.')
+        return None
+
+def get_game_schema(api_key, appid):
+    """
+    Get the achievement definitions (display name, description, icons) of a game.
+    
+    Parameters:
+    - api_key (str): The API key for Steam API.
+    - appid (int): The application ID of the game.
+    
+    Returns:
+    - (list): The 'achievements' entries of GetSchemaForGame, [] for games without achievements, or None on error.
+    """
+
+    game_schema_url = f'{STEAM_API_BASE}/ISteamUserStats/GetSchemaForGame/v2/?key={api_key}&appid={appid}&l=en'
+    response = make_request(game_schema_url, retry=4, wait=2, return_error=True)
+
+    if response is None or response.status_code not in (200, 400):
+        print(f'Error fetching achievement schema for appid {appid}.')
+        return None
+
+    if response.status_code == 400:
+        return []
+
+    game = loads(response.content).get('game') or {}
+
+    return (game.get('availableGameStats') or {}).get('achievements') or []
+
+#----------------------------------------------------------------------
+
+def get_game_schemas(api_key, appid_list, max_workers=8, use_cache=True):
+    """
+    Get the achievement definitions of many games, once per game for every user.
+    
+    Schemas are served from the local cache when fresh; missing ones are
+    fetched concurrently and cached.
+    
+    Parameters:
+    - api_key (str): The API key for Steam API.
+    - appid_list (list): The application IDs of the games.
+    - max_workers (int): Maximum number of requests in flight at the same time.
+    - use_cache (bool): Read from and write to the local schema cache.
+    
+    Returns:
+    - schemas (dict): appid (str) -> list of achievement definitions. Games whose schema could not be fetched are missing.
+    """
+
+    appids = [str(appid) for appid in dict.fromkeys(appid_list)]
+
+    cache_conn = connect_cache() if use_cache else None
+    schemas = get_cached_schemas(cache_conn, appids) if use_cache else {}
+    schemas = {appid: schema or [] for appid, schema in schemas.items()}
+
+    missing = [appid for appid in appids if appid not in schemas]
+    fetched = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_game_schema, api_key, appid): appid for appid in missing}
+        for future in as_completed(futures):
+            schema = future.result()
+            if schema is not None:
+                fetched[futures[future]] = schema
+
+    if use_cache:
+        if fetched:
+            # Games without achievements are cached as negative entries
+            store_schemas(cache_conn, {appid: schema or None for appid, schema in fetched.items()})
+        cache_conn.close()
+
+    schemas.update(fetched)
+
+    return schemas
+
+#----------------------------------------------------------------------
+
+def achievement_fetch_status(json_game_achievements):
+    """
+    Classify a get_game_achievements result as DONE, NO_STATS or FAILED.
+    """
+
+    if json_game_achievements is None:
+        return FAILED
+
+    playerstats = json_game_achievements.get('playerstats')
+
+    if not playerstats or playerstats.get('success') is False:
+        return NO_STATS
+
+    return DONE
+
+#----------------------------------------------------------------------
+
+def iter_game_achievements(steam_user_id, api_key, appid_list, max_workers=8):
+    """
+    Fetch achievements for many games concurrently, yielding results as they finish.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    - appid_list (list): The application IDs of the games.
+    - max_workers (int): Maximum number of requests in flight at the same time.
+    
+    Yields:
+    - (appid, json_game_achievements) tuples, in completion order. The JSON is None when the fetch failed.
+    """
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(get_game_achievements, steam_user_id, api_key, appid): appid
+            for appid in appid_list
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+#----------------------------------------------------------------------
+
+def get_games_achievements_batch(steam_user_id, api_key, appid_list, max_workers=8, show_progress=True):
+    """
+    Fetch achievements for a whole list of games using a bounded thread pool.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    - appid_list (list): The application IDs of the games.
+    - max_workers (int): Maximum number of requests in flight at the same time.
+    - show_progress (bool): Display a tqdm progress bar.
+    
+    Returns:
+    - collect_achievements_info (list): The 'playerstats' payloads, each tagged with its appid.
+    - no_information_games (list): The appids without achievement stats.
+    - failed_games (list): The appids whose request failed.
+    """
+
+    collect_achievements_info = []
+    no_information_games = []
+    failed_games = []
+
+    results = iter_game_achievements(steam_user_id, api_key, appid_list, max_workers=max_workers)
+
+    if show_progress:
+        results = tqdm(results, desc="Fetching achievements", total=len(appid_list), ncols=100)
+
+    for appid, acheivements_json in results:
+        status = achievement_fetch_status(acheivements_json)
+
+        if status == FAILED:
+            failed_games.append(appid)
+            continue
+
+        if status == NO_STATS:
+            no_information_games.append(appid)
+            continue
+
+        acheivements_info = acheivements_json.get('playerstats')
+        acheivements_info['appid'] = appid
+
+        collect_achievements_info.append(acheivements_info)
+
+    return collect_achievements_info, no_information_games, failed_games
+
+#----------------------------------------------------------------------
+
+def extract_game_metadatas(game_list, use_cache=True):
+    """
+    Get store metadata (genres, developers, descriptions...) for a list of games.
+    
+    Appids already present in the local metadata cache are served from it, so a
+    re-run over an unchanged library makes no store requests. Failed requests
+    are checkpointed: if the run is interrupted, its resumptions retry them up to
+    CHECKPOINT_MAX_RETRIES times. A completed run forgets them, so the next one starts afresh.
+    
+    Parameters:
+    - game_list (list): The appids (as str) to look up.
+    - use_cache (bool): Read from and write to the local metadata cache.
+    
+    Returns:
+    - df_game_metadata_final (pd.DataFrame): One row per game found in the store.
+    - num_not_found (int): Number of appids without metadata.
+    """
+
+    game_set = game_list
+
+    game_metadata_list = []
+    not_found_games_ids = []
+
+    cache_conn = connect_cache() if use_cache else None
+    cached = get_cached_appdetails(cache_conn, game_set) if use_cache else {}
+    fetched = {}
+    statuses = []
+
+    if cached:
+        print(f'{len(cached)} of {len(game_set)} games served from the metadata cache.')
+
+    # Settled appids are in the cache: the checkpoint only remembers the failures
+    checkpoint_conn = connect_raw() if use_cache else None
+    exhausted = set()
+    if use_cache:
+        _, settled = start_checkpoint(checkpoint_conn, 'metadata', '', [id for id in game_set if str(id) not in cached])
+        exhausted = {str(appid) for appid, status in settled.items() if status == FAILED}
+        if exhausted:
+            print(f'Skipping {len(exhausted)} games whose metadata request failed {CHECKPOINT_MAX_RETRIES} times since this crawl started.')
+
+    for id in game_set:
+
+        if str(id) in cached:
+            stage = cached[str(id)]
+        elif str(id) in exhausted:
+            not_found_games_ids.append(id)
+            continue
+        else:
+            response = make_request(f'{STEAM_STORE_BASE}/api/appdetails?appids={id}')
+
+            if response is None:
+                print(f'Error fetching metadata for game ID: {id}')
+                not_found_games_ids.append(id)
+                statuses.append((id, FAILED))
+                continue
+
+            # Only the stored fields are kept, for the cache as well
+            stage = decode_appdetails(response.content, id)
+            fetched[str(id)] = stage
+            statuses.append((id, DONE if stage is not None else NO_STATS))
+
+            # Flush regularly so an interrupted run keeps what it already paid for
+            if use_cache and len(fetched) >= 50:
+                store_appdetails(cache_conn, fetched)
+                mark_checkpoint(checkpoint_conn, 'metadata', '', statuses)
+                fetched = {}
+                statuses = []
+
+        if stage is None:
+            print(f'No metadata found for game ID: {id}')
+            not_found_games_ids.append(id)
+            continue
+
+        df_game_metadata = {
+            'steam_game_id': stage.get('steam_appid'),
+            'name': stage.get('name'),
+            'required_age': stage.get('required_age'),
+            'is_free': stage.get('is_free'),
+            'dlc': json.dumps(stage.get('dlc')) if stage.get('dlc') else None,
+            'about_the_game': stage.get('about_the_game'),
+            'short_description': stage.get('short_description'),
+            'supported_languages': json.dumps(stage.get('supported_languages')) if stage.get('supported_languages') else None,
+            'header_image': stage.get('header_image'),
+            'website': stage.get('website'),
+            'developers': json.dumps(stage.get('developers')) if stage.get('developers') else None,
+            'publishers': json.dumps(stage.get('publishers')) if stage.get('publishers') else None,
+            'genres': json.dumps(stage.get('genres')) if stage.get('genres') else None,
+            'categories': json.dumps(stage.get('categories')) if stage.get('categories') else None,
+            'media': json.dumps(stage.get('movies')) if stage.get('movies') else None,
+        }
+
+        game_metadata_list.append(df_game_metadata)
+
+    if use_cache:
+        if fetched:
+            store_appdetails(cache_conn, fetched)
+        if statuses:
+            mark_checkpoint(checkpoint_conn, 'metadata', '', statuses)
+        # The run completed: failures are only counted across the resumptions of one interrupted run
+        clear_checkpoint(checkpoint_conn, 'metadata', '')
+        cache_conn.close()
+        checkpoint_conn.close()
+
+    df_game_metadata_final = pd.DataFrame(game_metadata_list)
+
+    # appdetails follows redirects: two requested appids can resolve to the same steam_appid, stored once
+    if not df_game_metadata_final.empty:
+        df_game_metadata_final = df_game_metadata_final.drop_duplicates(subset=['steam_game_id'], ignore_index=True)
+
+    num_not_found = len(not_found_games_ids)
+
+    return df_game_metadata_final, num_not_found
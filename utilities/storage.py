@@ -0,0 +1,577 @@
+import os
+import time
+import pandas as pd
+from datetime import datetime
+from tqdm import tqdm
+
+from utilities.raw_schema import ensure_raw_table, connect_raw, bump_table_generation, CDC_KEY_COLUMNS, CDC_OWNER_COLUMN
+from utilities.metrics import record_rows, stage
+from utilities.checkpoint import start_checkpoint, mark_checkpoint, clear_checkpoint, DONE, FAILED, NO_STATS
+from utilities.transform import flatten_achievements, count_achievements
+from utilities.steam_api import iter_game_achievements, achievement_fetch_status
+
+
+#---------------------------------- Send data to database ----------------------------------#
+
+def save_to_sqlite(df, table_name, method ):
+    """
+    Save DataFrame to SQLite database.
+    
+    Parameters:
+    - df (pd.DataFrame): The DataFrame to save.
+    - method (str): The method to use when saving ('append', 'replace' or 'cdc').
+      'cdc' only writes rows whose content changed since the current stored version.
+    """
+
+    with stage(f'save_to_sqlite.{table_name}'):
+        conn = connect_raw()
+
+        if method == 'cdc':
+            if table_name not in CDC_KEY_COLUMNS:
+                conn.close()
+                raise ValueError(f'Table {table_name} has no key for change data capture.')
+
+            ensure_raw_table(conn, table_name)
+            try:
+                written, closed = save_cdc(conn, df, table_name)
+                conn.commit()
+                record_rows(table_name, written)
+                print(f'{table_name}: {written} new or changed rows written, {len(df) - written} unchanged, {closed} versions closed.')
+            except Exception as e:
+                conn.rollback()
+                print(f'Error inserting data into table {table_name}: {e}')
+
+            conn.close()
+            return
+
+        print(f'Checking if table {table_name} exists...')
+
+        replaced = method == 'replace'
+
+        if ensure_raw_table(conn, table_name):
+            conn.commit()
+            print(f'Table {table_name} and its indexes are ready.')
+
+            # Keep the explicit DDL and indexes: empty the table instead of letting pandas drop it
+            if method == 'replace':
+                conn.execute(f'DELETE FROM {table_name}')
+                method = 'append'
+        else:
+            try:
+                df.head(0).to_sql(table_name, conn, if_exists='fail', index=False)  # Create table
+                print(f'Table {table_name} created successfully.')
+            except Exception as e:
+                print(f'Table {table_name} already exists. Proceeding to insert data.')
+
+        print(f'Saving data to table {table_name} using method {method}... {len(df)} records to be inserted.')
+
+        try:
+            print(f'Inserting data into table {table_name}...')
+            if replaced:
+                bump_table_generation(conn, table_name)
+            df.to_sql(table_name, conn, if_exists=method, index=False)
+            conn.commit()
+            record_rows(table_name, len(df))
+        except Exception as e:
+            print(f'Error inserting data into table {table_name}: {e}')
+
+        conn.close()
+
+def save_cdc(conn, df, table_name):
+    """
+    Write a snapshot in change-data-capture mode (SCD type 2).
+
+    Every row is hashed without dh_updated. A row is only written when its key
+    has no current version or the current version has another hash; the
+    replaced version gets valid_to set to the new dh_updated. Unchanged rows
+    are not written at all. For tables of CDC_OWNER_COLUMN, the current versions
+    of an owner whose key is absent from its snapshot (e.g. a game no longer
+    owned or played) are closed as well.
+
+    Parameters:
+    - conn (sqlite3.Connection): Connection to the raw database. The caller commits.
+    - df (pd.DataFrame): The snapshot to save, with a dh_updated column.
+    - table_name (str): A table of CDC_KEY_COLUMNS.
+
+    Returns:
+    - written (int): Number of rows written.
+    - closed (int): Number of previous versions closed.
+    """
+
+    key_columns = list(CDC_KEY_COLUMNS[table_name])
+    payload_columns = [column for column in df.columns if column not in ('dh_updated', 'row_hash', 'valid_from', 'valid_to')]
+
+    df_cdc = df.copy()
+    df_cdc['row_hash'] = pd.util.hash_pandas_object(df_cdc[payload_columns].astype(str), index=False).map('{:016x}'.format).to_numpy()
+    df_cdc['valid_from'] = df_cdc['dh_updated']
+    df_cdc['valid_to'] = None
+
+    key_match = ' AND '.join(f'i.{column} = t.{column}' for column in key_columns)
+
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS cdc_incoming (position INTEGER, {', '.join(key_columns)}, row_hash TEXT, dh_updated TIMESTAMP)")
+    conn.execute("DELETE FROM temp.cdc_incoming")
+    conn.executemany(
+        f"INSERT INTO temp.cdc_incoming VALUES ({', '.join('?' * (len(key_columns) + 3))})",
+        zip(
+            range(len(df_cdc)),
+            *[df_cdc[column].astype(object).tolist() for column in key_columns],
+            df_cdc['row_hash'].tolist(),
+            df_cdc['dh_updated'].astype(str).tolist()
+        )
+    )
+
+    # New keys and changed rows: no current version with the same hash
+    changed_positions = [row[0] for row in conn.execute(f"""
+        SELECT i.position FROM temp.cdc_incoming i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM main.{table_name} t
+            WHERE {key_match} AND t.valid_to IS NULL AND t.row_hash = i.row_hash
+        )
+    """)]
+
+    # Close the current versions being replaced (rows saved before CDC have no hash and are closed too)
+    closed = conn.execute(f"""
+        UPDATE main.{table_name} AS t
+        SET valid_to = i.dh_updated
+        FROM temp.cdc_incoming i
+        WHERE {key_match} AND t.valid_to IS NULL AND t.row_hash IS NOT i.row_hash
+    """).rowcount
+
+    owner_column = CDC_OWNER_COLUMN.get(table_name)
+
+    # Keys gone from the snapshot of their owner: closed at the owner's snapshot time
+    if owner_column:
+        closed += conn.execute(f"""
+            UPDATE main.{table_name} AS t
+            SET valid_to = (SELECT MAX(o.dh_updated) FROM temp.cdc_incoming o WHERE o.{owner_column} = t.{owner_column})
+            WHERE t.valid_to IS NULL
+            AND t.{owner_column} IN (SELECT {owner_column} FROM temp.cdc_incoming)
+            AND NOT EXISTS (SELECT 1 FROM temp.cdc_incoming i WHERE {key_match})
+        """).rowcount
+
+    df_cdc.iloc[changed_positions].to_sql(table_name, conn, if_exists='append', index=False)
+    conn.execute("DELETE FROM temp.cdc_incoming")
+
+    return len(changed_positions), closed
+
+#---------------------------------- Streaming achievement stage ----------------------------------#
+
+# Stage rows older than this are considered abandoned and are fetched again.
+STAGE_MAX_AGE = int(os.getenv('STAGE_MAX_AGE', 24 * 3600))
+
+
+def stream_achievements_to_stage(steam_user_id, api_key, appid_list, max_workers=8, chunk_size=100, show_progress=True):
+    """
+    Fetch achievements concurrently and write them to the raw database in chunks, as they arrive.
+    
+    Each chunk is flattened into player_achievement (one row per achievement) and
+    reduced to per-game counts in achievement_stage, so memory stays flat
+    whatever the library size. Appids already staged by an interrupted run
+    (younger than STAGE_MAX_AGE) are skipped, as are the ones its crawl
+    checkpoint marked without stats or failed too many times. A game checkpointed
+    as done whose staged counts expired is requested again.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - api_key (str): The API key for Steam API.
+    - appid_list (list): The application IDs of the games.
+    - max_workers (int): Maximum number of requests in flight at the same time.
+    - chunk_size (int): Number of games written per transaction.
+    - show_progress (bool): Display a tqdm progress bar.
+    
+    Returns:
+    - no_information_games (list): The appids without achievement stats.
+    - failed_games (list): The appids whose request failed, in this run or too often in previous ones.
+    """
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'achievement_stage')
+    ensure_raw_table(conn, 'player_achievement')
+
+    stage_limit = str(datetime.fromtimestamp(time.time() - STAGE_MAX_AGE))
+    conn.execute(
+        "DELETE FROM achievement_stage WHERE steam_user_id = ? AND dh_updated < ?",
+        (str(steam_user_id), stage_limit)
+    )
+    conn.commit()
+
+    staged = {row[0] for row in conn.execute(
+        "SELECT steam_game_id FROM achievement_stage WHERE steam_user_id = ?", (str(steam_user_id),)
+    )}
+    _, settled = start_checkpoint(conn, 'achievements', steam_user_id, appid_list)
+
+    # The counts of a done game live in the stage: once they expired, the game is requested again
+    settled = {appid: status for appid, status in settled.items() if status != DONE or appid in staged}
+    pending = [appid for appid in appid_list if int(appid) not in staged and int(appid) not in settled]
+
+    if len(pending) < len(appid_list):
+        print(f'Resuming: {len(appid_list) - len(pending)} games already settled by a previous run.')
+
+    buffer = []
+    statuses = []
+    no_information_games = [appid for appid in appid_list if settled.get(int(appid)) == NO_STATS]
+    failed_games = [appid for appid in appid_list if settled.get(int(appid)) == FAILED]
+
+    results = iter_game_achievements(steam_user_id, api_key, pending, max_workers=max_workers)
+
+    if show_progress:
+        results = tqdm(results, desc="Fetching achievements", total=len(pending), ncols=100)
+
+    for appid, acheivements_json in results:
+        status = achievement_fetch_status(acheivements_json)
+
+        if status == FAILED:
+            failed_games.append(appid)
+        elif status == NO_STATS:
+            no_information_games.append(appid)
+        else:
+            acheivements_info = acheivements_json.get('playerstats')
+            acheivements_info['appid'] = appid
+
+            buffer.append(acheivements_info)
+
+        statuses.append((appid, status))
+
+        # Games are only checkpointed as done once their chunk is written
+        if len(buffer) >= chunk_size:
+            _write_achievement_chunk(conn, steam_user_id, buffer)
+            mark_checkpoint(conn, 'achievements', steam_user_id, statuses)
+            buffer = []
+            statuses = []
+
+    if buffer:
+        _write_achievement_chunk(conn, steam_user_id, buffer)
+
+    if statuses:
+        mark_checkpoint(conn, 'achievements', steam_user_id, statuses)
+
+    conn.close()
+
+    return no_information_games, failed_games
+
+
+def _write_achievement_chunk(conn, steam_user_id, achievement_payloads):
+    """
+    Flatten a chunk of payloads and write the per-achievement rows and the per-game counts in one transaction.
+    """
+
+    df_player_achievement = flatten_achievements(achievement_payloads, steam_user_id)
+    df_counts = count_achievements(achievement_payloads, df_player_achievement)
+
+    dh_updated = str(datetime.now())
+
+    with conn:
+        _replace_player_achievements(conn, steam_user_id, df_counts['steam_game_id'], df_player_achievement, dh_updated)
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO achievement_stage (
+                steam_user_id,
+                steam_game_id,
+                game_name,
+                total_game_acheivements,
+                total_game_acheivements_unlocked,
+                dh_updated
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (str(steam_user_id), int(row.steam_game_id), row.game_name, int(row.total_game_acheivements), int(row.total_game_acheivements_unlocked), dh_updated)
+                for row in df_counts.itertuples(index=False)
+            ]
+        )
+
+    record_rows('player_achievement', len(df_player_achievement))
+    record_rows('achievement_stage', len(df_counts))
+
+
+def _replace_player_achievements(conn, steam_user_id, appids, df_player_achievement, dh_updated):
+    """
+    Replace the player_achievement rows of the given games. The caller owns the transaction.
+    """
+
+    conn.executemany(
+        "DELETE FROM player_achievement WHERE steam_user_id = ? AND steam_game_id = ?",
+        [(str(steam_user_id), int(appid)) for appid in appids]
+    )
+    conn.executemany(
+        """
+        INSERT INTO player_achievement (steam_user_id, steam_game_id, apiname, achieved, unlocktime, dh_updated)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (row.steam_user_id, int(row.steam_game_id), row.apiname, int(row.achieved), int(row.unlocktime), dh_updated)
+            for row in df_player_achievement.itertuples(index=False)
+        ]
+    )
+
+
+def save_player_achievements(steam_user_id, df_player_achievement, appids):
+    """
+    Write the flattened achievements of a user in one transaction, replacing what was stored for those games.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - df_player_achievement (pd.DataFrame): Output of flatten_achievements.
+    - appids (list): Every game fetched, including the ones without any achievement.
+    """
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'player_achievement')
+
+    with stage('save_to_sqlite.player_achievement'):
+        with conn:
+            _replace_player_achievements(conn, steam_user_id, appids, df_player_achievement, str(datetime.now()))
+
+    conn.close()
+
+    record_rows('player_achievement', len(df_player_achievement))
+
+
+def load_achievement_stage(steam_user_id):
+    """
+    Read the staged achievement counts of a user, shaped like df_achievements_raw.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    
+    Returns:
+    - df_achievements_raw (pd.DataFrame): One row per staged game.
+    """
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'achievement_stage')
+    df_achievements_raw = pd.read_sql_query(
+        """
+        SELECT
+            steam_user_id,
+            steam_game_id,
+            game_name AS appid,
+            total_game_acheivements,
+            total_game_acheivements_unlocked
+        FROM achievement_stage
+        WHERE steam_user_id = ?
+        """,
+        conn,
+        params=(str(steam_user_id),)
+    )
+    conn.close()
+
+    return df_achievements_raw
+
+
+def clear_achievement_stage(steam_user_id):
+    """
+    Drop the staged rows and the crawl checkpoints of a user once its extraction is complete.
+    """
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'achievement_stage')
+    with conn:
+        conn.execute("DELETE FROM achievement_stage WHERE steam_user_id = ?", (str(steam_user_id),))
+    clear_checkpoint(conn, 'achievements', steam_user_id)
+    conn.close()
+
+def load_player_achievements(steam_user_id, appid):
+    """
+    Read the stored achievements of a user for one game from the raw database.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - appid (int): The application ID of the game.
+    
+    Returns:
+    - achievements (list): apiname / achieved / unlocktime dicts, or None when the game was never extracted.
+    """
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'player_achievement')
+    df_achievements = pd.read_sql_query(
+        """
+        SELECT apiname, achieved, unlocktime
+        FROM player_achievement
+        WHERE steam_user_id = ? AND steam_game_id = ?
+        """,
+        conn,
+        params=(str(steam_user_id), int(appid))
+    )
+    conn.close()
+
+    if df_achievements.empty:
+        return None
+
+    return df_achievements.to_dict(orient='records')
+
+
+def load_user_games(steam_user_id):
+    """
+    Read the current games of a user from the raw database: the current CDC versions, or the latest appended snapshot.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    
+    Returns:
+    - game_df (pd.DataFrame): name and steam_game_id columns, or None when the user was never saved.
+    """
+
+    conn = connect_raw()
+    ensure_raw_table(conn, 'collection_game_data')
+    game_df = pd.read_sql_query(
+        """
+        SELECT DISTINCT g.name, g.steam_game_id
+        FROM collection_game_data g
+        WHERE g.steam_user_id_x = ?
+        AND g.valid_to IS NULL
+        AND (
+            g.row_hash IS NOT NULL
+            OR g.dh_updated = (
+                SELECT MAX(m.dh_updated) FROM collection_game_data m
+                WHERE m.steam_user_id_x = g.steam_user_id_x AND m.valid_to IS NULL
+            )
+        )
+        """,
+        conn,
+        params=(str(steam_user_id),)
+    )
+    conn.close()
+
+    if game_df.empty:
+        return None
+
+    return game_df
+
+#---------------------------------- Incremental extraction watermarks ----------------------------------#
+
+def _ensure_watermark_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS game_watermark
+        (
+            steam_user_id TEXT,
+            steam_game_id INTEGER,
+            rtime_last_played INTEGER,
+            playtime_forever INTEGER,
+            game_name TEXT,
+            total_game_acheivements INTEGER,
+            total_game_acheivements_unlocked INTEGER,
+            dh_updated TIMESTAMP,
+            PRIMARY KEY (steam_user_id, steam_game_id)
+        )
+    """)
+
+
+def split_games_by_watermark(steam_user_id, df_games):
+    """
+    Split owned games between the ones that changed since the last successful run and the ones that did not.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - df_games (pd.DataFrame): Raw GetOwnedGames rows (appid, rtime_last_played, playtime_forever).
+    
+    Returns:
+    - appids_to_fetch (list): Appids whose achievements must be fetched again.
+    - df_reused (pd.DataFrame): Stored achievement counts for unchanged games, shaped like df_achievements_raw in main.py.
+    """
+
+    conn = connect_raw()
+    _ensure_watermark_table(conn)
+    df_watermark = pd.read_sql_query(
+        "SELECT * FROM game_watermark WHERE steam_user_id = ?", conn, params=(str(steam_user_id),)
+    )
+    conn.close()
+
+    df_current = pd.DataFrame({
+        'steam_game_id': df_games['appid'],
+        'rtime_last_played': df_games['rtime_last_played'] if 'rtime_last_played' in df_games.columns else 0,
+        'playtime_forever': df_games['playtime_forever'],
+    })
+
+    df_compare = pd.merge(df_current, df_watermark, on='steam_game_id', how='left', suffixes=('', '_stored'))
+
+    unchanged = (
+        (df_compare['rtime_last_played'] == df_compare['rtime_last_played_stored']) &
+        (df_compare['playtime_forever'] == df_compare['playtime_forever_stored'])
+    )
+
+    appids_to_fetch = df_compare.loc[~unchanged, 'steam_game_id'].tolist()
+
+    # Games stored without counts had no achievement stats: keep them out, like a failed fetch
+    df_stored = df_compare[unchanged & df_compare['total_game_acheivements'].notna()]
+
+    df_reused = pd.DataFrame(
+        {
+            'steam_user_id': str(steam_user_id),
+            'steam_game_id': df_stored['steam_game_id'],
+            'appid': df_stored['game_name'],
+            'total_game_acheivements': df_stored['total_game_acheivements'].astype(int),
+            'total_game_acheivements_unlocked': df_stored['total_game_acheivements_unlocked'].astype(int)
+        }
+    )
+
+    return appids_to_fetch, df_reused
+
+
+def update_game_watermarks(steam_user_id, df_games, df_achievements_raw, fetched_appids):
+    """
+    Record the watermark of every game fetched in this run.
+    
+    Parameters:
+    - steam_user_id (str): The Steam user ID.
+    - df_games (pd.DataFrame): Raw GetOwnedGames rows (appid, rtime_last_played, playtime_forever).
+    - df_achievements_raw (pd.DataFrame): Achievement counts per game, as built in main.py.
+    - fetched_appids (list): Appids settled in this run (done or without stats). Those missing from df_achievements_raw
+                             are stored without counts and skipped until they change; failed requests must not be passed.
+    """
+
+    df_fetched = df_games[df_games['appid'].isin(fetched_appids)]
+
+    df_watermark = pd.merge(
+        pd.DataFrame({
+            'steam_game_id': df_fetched['appid'],
+            'rtime_last_played': df_fetched['rtime_last_played'] if 'rtime_last_played' in df_fetched.columns else 0,
+            'playtime_forever': df_fetched['playtime_forever'],
+        }),
+        df_achievements_raw[['steam_game_id', 'appid', 'total_game_acheivements', 'total_game_acheivements_unlocked']].drop_duplicates(subset=['steam_game_id']),
+        on='steam_game_id',
+        how='left'
+    )
+
+    dh_updated = str(datetime.now())
+
+    conn = connect_raw()
+    _ensure_watermark_table(conn)
+    conn.executemany(
+        """
+        INSERT INTO game_watermark (
+            steam_user_id,
+            steam_game_id,
+            rtime_last_played,
+            playtime_forever,
+            game_name,
+            total_game_acheivements,
+            total_game_acheivements_unlocked,
+            dh_updated
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(steam_user_id, steam_game_id) DO UPDATE SET
+            rtime_last_played = excluded.rtime_last_played,
+            playtime_forever = excluded.playtime_forever,
+            game_name = excluded.game_name,
+            total_game_acheivements = excluded.total_game_acheivements,
+            total_game_acheivements_unlocked = excluded.total_game_acheivements_unlocked,
+            dh_updated = excluded.dh_updated
+        """,
+        [
+            (
+                str(steam_user_id),
+                int(row.steam_game_id),
+                int(row.rtime_last_played),
+                int(row.playtime_forever),
+                None if pd.isna(row.appid) else row.appid,
+                None if pd.isna(row.total_game_acheivements) else int(row.total_game_acheivements),
+                None if pd.isna(row.total_game_acheivements_unlocked) else int(row.total_game_acheivements_unlocked),
+                dh_updated
+            )
+            for row in df_watermark.itertuples(index=False)
+        ]
+    )
+    conn.commit()
+    conn.close()
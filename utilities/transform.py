@@ -0,0 +1,325 @@
+import itertools
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from dateutil import tz
+
+
+#---------------------------------- Payload transformations ----------------------------------#
+#
+# Vectorized shaping of the Steam payloads: no per-row Python callbacks, so the
+# transform stays cheap once fetching is fast.
+
+# A zone with a transition table (/etc/localtime or $TZ) converts in bulk; tzlocal() is only a per-value fallback.
+LOCAL_TZ = tz.gettz() or tz.tzlocal()
+
+
+def unix_to_datetime(values):
+    """
+    Convert Unix timestamps to naive local datetimes, like datetime.fromtimestamp but for a whole column.
+
+    Parameters:
+    - values (pd.Series or np.ndarray): Unix timestamps in seconds.
+
+    Returns:
+    - (pd.Series or pd.DatetimeIndex): datetime64 values in local time, a Series when given one.
+    """
+
+    if isinstance(values, pd.Series):
+        return pd.to_datetime(values, unit='s', utc=True).dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+
+    return pd.to_datetime(values, unit='s', utc=True).tz_convert(LOCAL_TZ).tz_localize(None)
+
+
+def build_user_frame(players_info):
+    """
+    Shape GetPlayerSummaries 'players' entries into the profile_data layout.
+
+    Parameters:
+    - players_info (list): The 'players' entries returned by GetPlayerSummaries.
+
+    Returns:
+    - df_user_final (pd.DataFrame): One row per player.
+    """
+
+    df_steam_user = pd.DataFrame(players_info)
+
+    df_user_final = pd.DataFrame(
+        {
+        'steamid': df_steam_user['steamid'],
+        'communityvisibilitystate': df_steam_user['communityvisibilitystate'],
+        'profilestate': df_steam_user['profilestate'],
+        'avatarhash': df_steam_user['avatarhash'],
+        'personaname': df_steam_user['personaname'] if 'personaname' in df_steam_user.columns else None,
+        'profileurl': df_steam_user['profileurl'],
+        'timecreated': unix_to_datetime(df_steam_user['timecreated']) if 'timecreated' in df_steam_user.columns else None,
+        'lastlogoff': unix_to_datetime(df_steam_user['lastlogoff']) if 'lastlogoff' in df_steam_user.columns else None,
+        'loccountrycode': df_steam_user['loccountrycode'].astype('category') if 'loccountrycode' in df_steam_user.columns else None,
+        'avatarmedium': df_steam_user['avatarmedium'],
+        'dh_updated': datetime.now()
+        }
+    )
+
+    return df_user_final
+
+
+def _owner_column(steam_user_id, count=None):
+    """
+    Categorical steam_user_id column: either one ID repeated 'count' times, or one ID per row.
+    """
+
+    if np.isscalar(steam_user_id):
+        # Codes are all 0 by construction: skip their validation, which costs more than the column on small frames
+        return pd.Categorical.from_codes(np.zeros(count, dtype='int8'), dtype=pd.CategoricalDtype([str(steam_user_id)]), validate=False)
+
+    return pd.Categorical(np.asarray(steam_user_id, dtype=object))
+
+
+def build_game_frame(games_info, steam_user_id):
+    """
+    Shape GetOwnedGames entries into the collection_game_data layout, keeping played games only.
+
+    Several users can be shaped in one pass by concatenating their games and
+    giving the owner of every entry.
+
+    Parameters:
+    - games_info (list): The 'games' entries returned by GetOwnedGames.
+    - steam_user_id (str or list): The Steam user ID, or one Steam user ID per entry of games_info.
+
+    Returns:
+    - df_game_information_filtered (pd.DataFrame): The played games' watermark fields: appid, rtime_last_played, playtime_forever.
+    - df_game_information_final (pd.DataFrame): The played games shaped for collection_game_data.
+    """
+
+    played = np.fromiter(map(itemgetter('playtime_forever'), games_info), dtype='int64', count=len(games_info)) > 0
+    played_games = list(itertools.compress(games_info, played))
+    count = len(played_games)
+    fields = set(itertools.chain.from_iterable(played_games))
+
+    # Column-wise extraction into typed arrays: building frames from dicts or lists costs more than the rest of the
+    # transform on a single user's library. Missing values become NaN in float columns, like pandas would do.
+    def column(field, dtype=object):
+        if field not in fields:
+            return None
+        return np.array([game.get(field) for game in played_games], dtype=dtype)
+
+    appids = np.fromiter(map(itemgetter('appid'), played_games), dtype='int64', count=count)
+    playtime_forever = np.fromiter(map(itemgetter('playtime_forever'), played_games), dtype='int64', count=count)
+    rtime_last_played = column('rtime_last_played', 'float64')
+
+    if np.isscalar(steam_user_id):
+        steam_user_ids = _owner_column(steam_user_id, count)
+    else:
+        steam_user_ids = _owner_column(np.asarray(steam_user_id, dtype=object)[played])
+
+    # Watermark fields are integers: a game never launched has no rtime_last_played, stored as 0 like Steam does
+    df_game_information_filtered = pd.DataFrame(
+        {
+            'appid': appids,
+            'rtime_last_played': np.nan_to_num(rtime_last_played, nan=0).astype('int64') if rtime_last_played is not None else 0,
+            'playtime_forever': playtime_forever,
+        },
+        copy=False
+    )
+
+    df_game_information_final = pd.DataFrame(
+        {
+            'steam_user_id': steam_user_ids,
+            'steam_game_id': appids,
+            'name': column('name'),
+            'last_played_timestamp': unix_to_datetime(rtime_last_played) if rtime_last_played is not None else None,
+            'playtime_forever': playtime_forever,
+            'img_game_cover_url': column('img_icon_url'),
+            'has_community_visible_stats': column('has_community_visible_stats'),
+            'playtime_2weeks': column('playtime_2weeks', 'float64'),
+            'dh_updated': datetime.now()
+        },
+        copy=False
+    )
+
+    return df_game_information_filtered, df_game_information_final
+
+
+def flatten_achievements(achievement_payloads, steam_user_id):
+    """
+    Flatten GetPlayerAchievements payloads into one row per (game, achievement).
+
+    Parameters:
+    - achievement_payloads (list): The 'playerstats' payloads, each tagged with its appid.
+    - steam_user_id (str or list): The Steam user ID the payloads belong to, or one Steam user ID per payload.
+
+    Returns:
+    - df_player_achievement (pd.DataFrame): steam_user_id, steam_game_id, apiname, achieved, unlocktime.
+    """
+
+    achievement_lists = [payload.get('achievements') or [] for payload in achievement_payloads]
+    lengths = [len(achievements) for achievements in achievement_lists]
+    total = sum(lengths)
+
+    # Column-wise extraction: one tight pass per field instead of building a frame from 'total' dicts
+    achievements = list(itertools.chain.from_iterable(achievement_lists))
+
+    df_player_achievement = pd.DataFrame(
+        {
+            'steam_user_id': _owner_column(steam_user_id, total) if np.isscalar(steam_user_id) else _owner_column(np.repeat(np.asarray(steam_user_id, dtype=object), lengths)),
+            'steam_game_id': np.repeat(np.array([payload['appid'] for payload in achievement_payloads], dtype='int64'), lengths),
+            'apiname': list(map(itemgetter('apiname'), achievements)),
+            'achieved': np.fromiter(map(itemgetter('achieved'), achievements), dtype='int64', count=total),
+            'unlocktime': np.fromiter(map(itemgetter('unlocktime'), achievements), dtype='int64', count=total),
+        }
+    )
+
+    return df_player_achievement
+
+
+def _achievement_counts(achievement_payloads, df_player_achievement=None):
+    """
+    Per-payload appid, game name, total and unlocked achievements, as arrays.
+    """
+
+    achievement_lists = [payload.get('achievements') or () for payload in achievement_payloads]
+    lengths = np.fromiter(map(len, achievement_lists), dtype='int64', count=len(achievement_lists))
+
+    if df_player_achievement is not None:
+        # Rows are laid out payload after payload: sum the achieved flags of each payload's slice
+        unlocked = np.bincount(
+            np.repeat(np.arange(len(lengths)), lengths),
+            weights=df_player_achievement['achieved'].to_numpy(),
+            minlength=len(lengths)
+        ).astype('int64')
+    else:
+        get_achieved = itemgetter('achieved')
+        unlocked = np.fromiter((sum(map(get_achieved, achievements)) for achievements in achievement_lists), dtype='int64', count=len(achievement_lists))
+
+    return (
+        np.fromiter(map(itemgetter('appid'), achievement_payloads), dtype='int64', count=len(achievement_payloads)),
+        [payload.get('gameName') for payload in achievement_payloads],
+        lengths,
+        unlocked,
+    )
+
+
+def count_achievements(achievement_payloads, df_player_achievement=None):
+    """
+    Count total and unlocked achievements per game.
+
+    Games without any achievement keep a row with zero counts.
+
+    Parameters:
+    - achievement_payloads (list): The 'playerstats' payloads, each tagged with its appid.
+    - df_player_achievement (pd.DataFrame): Output of flatten_achievements for the same payloads, if already built.
+
+    Returns:
+    - df_counts (pd.DataFrame): steam_game_id, game_name, total_game_acheivements, total_game_acheivements_unlocked.
+    """
+
+    appids, game_names, totals, unlocked = _achievement_counts(achievement_payloads, df_player_achievement)
+
+    df_counts = pd.DataFrame(
+        {
+            'steam_game_id': appids,
+            'game_name': game_names,
+            'total_game_acheivements': totals,
+            'total_game_acheivements_unlocked': unlocked,
+        }
+    )
+
+    return df_counts
+
+
+def build_achievement_counts(achievement_payloads, steam_user_id, df_player_achievement=None):
+    """
+    Reduce GetPlayerAchievements payloads to per-game counts, shaped like df_achievements_raw.
+
+    Parameters:
+    - achievement_payloads (list): The 'playerstats' payloads, each tagged with its appid.
+    - steam_user_id (str or list): The Steam user ID the payloads belong to, or one Steam user ID per payload.
+    - df_player_achievement (pd.DataFrame): Output of flatten_achievements for the same payloads, if already built.
+
+    Returns:
+    - df_achievements_raw (pd.DataFrame): steam_user_id, steam_game_id, appid (game name) and the two counts.
+    """
+
+    appids, game_names, totals, unlocked = _achievement_counts(achievement_payloads, df_player_achievement)
+
+    df_achievements_raw = pd.DataFrame(
+        {
+            'steam_user_id': _owner_column(steam_user_id, len(appids)),
+            'steam_game_id': appids,
+            'appid': game_names,
+            'total_game_acheivements': totals,
+            'total_game_acheivements_unlocked': unlocked
+        }
+    )
+
+    return df_achievements_raw
+
+
+def join_achievement_counts(df_game_information_final, df_achievements_raw):
+    """
+    Attach the achievement counts to the played games of one user, shaped as collection_game_data.
+
+    Equivalent to an inner merge on steam_game_id keeping the games' order, but
+    looked up through an index: a full merge costs more than the whole
+    transform on a single user's library.
+
+    Parameters:
+    - df_game_information_final (pd.DataFrame): Output of build_game_frame.
+    - df_achievements_raw (pd.DataFrame): Counts per game. When a game appears twice, the first row is kept.
+
+    Returns:
+    - df_game_status (pd.DataFrame): steam_user_id_x, the game columns and the two counts, games without counts left out.
+    """
+
+    df_counts = df_achievements_raw[['steam_game_id', 'total_game_acheivements', 'total_game_acheivements_unlocked']]
+    appids = pd.Index(df_counts['steam_game_id'].to_numpy())
+
+    if not appids.is_unique:
+        first = ~appids.duplicated()
+        df_counts = df_counts[first]
+        appids = appids[first]
+
+    positions = appids.get_indexer(df_game_information_final['steam_game_id'].to_numpy())
+    matched = positions >= 0
+    positions = positions[matched]
+
+    columns = {
+        'steam_user_id_x' if column == 'steam_user_id' else column: df_game_information_final[column].array[matched]
+        for column in df_game_information_final.columns
+        if column != 'has_community_visible_stats'
+    }
+
+    for column in ('total_game_acheivements', 'total_game_acheivements_unlocked'):
+        columns[column] = df_counts[column].to_numpy()[positions]
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def describe_achievements(achievements, schema=None):
+    """
+    Join a player's achievement states with the game's achievement schema.
+
+    Parameters:
+    - achievements (list): apiname / achieved / unlocktime dicts of one player and game.
+    - schema (list): The GetSchemaForGame 'achievements' entries of the game, if known.
+
+    Returns:
+    - described (list): apiname, name, description, achieved (bool) and unlocktime dicts, in the player's order.
+    """
+
+    definitions = {definition['name']: definition for definition in schema or []}
+
+    described = []
+
+    for achievement in achievements:
+        definition = definitions.get(achievement['apiname'], {})
+        described.append({
+            'apiname': achievement['apiname'],
+            'name': definition.get('displayName') or achievement.get('name') or achievement['apiname'],
+            'description': definition.get('description') or achievement.get('description'),
+            'achieved': bool(achievement['achieved']),
+            'unlocktime': achievement.get('unlocktime'),
+        })
+
+    return described